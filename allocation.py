@@ -1,15 +1,37 @@
+import os
 import sqlite3
 
-import pydevd_pycharm
+from config import ALLOCATION_STRATEGY, ALLOCATION_WORKERS, PARALLEL_MIN_REQUIREMENTS, MIN_SCRAP_LENGTH, NEW_PROFILE_LENGTH, get_profile_name_by_id, get_profile_id_by_name, get_cutting_allowance
+from cut_patterns import cut_pattern
+from cutting_stock import pack_bars
+from scrap_index import ScrapIndex
+import instrumentation
 
-from config import MIN_SCRAP_LENGTH, NEW_PROFILE_LENGTH, classify_bin, get_profile_name_by_id, get_profile_id_by_name, get_cutting_allowance
+ALLOCATION_STRATEGIES = ("best_fit", "scored")
+LABOR_PENALTY_WEIGHT = 0.5
+
+
+class AllocationCancelled(Exception):
+    """Raised from a progress callback to stop an allocation run; allocate_batch() rolls it back"""
 
 # --- Improved Best Fit Allocation Algorithm ---
-def best_fit_allocation(required_length: float, required_qty: int, profile_name: str, conn):
+@instrumentation.timed("allocation.best_fit_allocation")
+def best_fit_allocation(required_length: float, required_qty: int, profile_name: str, conn, index=None,
+                        allocate_new=True, strategy=ALLOCATION_STRATEGY):
     """
     Implements true best-fit algorithm to allocate scrap materials.
     Returns allocation results and updates database.
+
+    When a ScrapIndex is passed, the allocation only updates the index and the
+    caller is responsible for flushing it and committing.
+    With allocate_new=False only scrap is used and the shortfall is left in
+    'remaining_requirement' for the caller to cut from new profiles.
+    strategy "best_fit" always takes the shortest scrap that fits one piece,
+    "scored" takes the scrap with the lowest leftover + gap + labor penalty score.
     """
+    if strategy not in ALLOCATION_STRATEGIES:
+        raise ValueError(f"Unknown allocation strategy '{strategy}', expected one of {ALLOCATION_STRATEGIES}")
+
     cutting_allowance = get_cutting_allowance(profile_name)
 
     # Input validation
@@ -21,7 +43,10 @@ def best_fit_allocation(required_length: float, required_qty: int, profile_name:
         raise ValueError(
             f"Required length ({required_length}mm) too small for cutting allowance ({cutting_allowance}mm)")
 
-    cursor = conn.cursor()
+    owns_index = index is None
+    if owns_index:
+        # Only rows that fit at least one piece can be used
+        index = ScrapIndex.load(conn, [profile_name], min_length=required_length + cutting_allowance)
 
     allocation_result = {
         'required_length': required_length,
@@ -41,16 +66,12 @@ def best_fit_allocation(required_length: float, required_qty: int, profile_name:
 
     while remaining > 0:
 
-        # Get available scrap profiles of the same type, sorted by length ASCENDING for true best-fit
-        cursor.execute("""
-            SELECT profile_id, length, quantity
-            FROM profiles
-            WHERE name = ? AND length >= ?
-            ORDER BY length ASC
-            LIMIT 1
-        """, (profile_name, req_length_ind))
-
-        available_profile = cursor.fetchone()
+        if strategy == "scored":
+            used_ids = {scrap['profile_id'] for scrap in allocation_result['scrap_used']}
+            available_profile = select_scored_scrap(index, profile_name, req_length_ind, remaining, used_ids)
+        else:
+            # Get the shortest available scrap of the same type that fits one piece
+            available_profile = index.find(profile_name, req_length_ind)
 
         if not available_profile:
             break
@@ -59,7 +80,8 @@ def best_fit_allocation(required_length: float, required_qty: int, profile_name:
         # profile_name = get_profile_name_by_id(profile_id)
 
         # Calculate how many pieces we can get from this scrap profile
-        pieces_per_scrap = int(scrap_length // req_length_ind)
+        pattern = cut_pattern(req_length_ind, scrap_length)
+        pieces_per_scrap = pattern.pieces_per_stock
 
         scrap_needed = min(
             (remaining + pieces_per_scrap - 1) // pieces_per_scrap,
@@ -78,7 +100,7 @@ def best_fit_allocation(required_length: float, required_qty: int, profile_name:
             remaining -= pieces_obtained
 
             if full_scraps > 0:
-                leftover_full = scrap_length - (pieces_per_scrap * req_length_ind)
+                leftover_full = pattern.leftover_full
             else:
                 leftover_full = 0
 
@@ -97,57 +119,19 @@ def best_fit_allocation(required_length: float, required_qty: int, profile_name:
                 'total_waste': leftover_partial + leftover_full
             })
 
-            # Update database - reduce scrap quantity
-            new_scrap_qty = scrap_qty - scrap_needed
-            if new_scrap_qty > 0:
-                cursor.execute("""
-                    UPDATE profiles SET quantity = ? WHERE profile_id = ? and length = ?
-                """, (new_scrap_qty, profile_id, scrap_length))
-            else:
-                cursor.execute("DELETE FROM profiles WHERE profile_id = ? and length = ?", (profile_id, scrap_length))
+            # Reduce scrap quantity
+            index.consume(profile_id, profile_name, scrap_length, scrap_needed)
 
             if leftover_full >= MIN_SCRAP_LENGTH:
-                try:
-                    cursor.execute("""
-                        INSERT INTO profiles (profile_id, name, length, quantity, bin)
-                        VALUES (?, ?, ?, ?, ?)
-                        ON CONFLICT(profile_id, length) DO UPDATE
-                        SET quantity = quantity + excluded.quantity
-                    """, (profile_id, profile_name, leftover_full, full_scraps, classify_bin(leftover_full)))
-
-                    # Update bin_summary
-                    cursor.execute("""
-                        INSERT INTO bin_summary (bin, total_quantity)
-                        VALUES (?, ?)
-                        ON CONFLICT(bin) DO UPDATE SET total_quantity = total_quantity + excluded.total_quantity
-                    """, (classify_bin(leftover_full), full_scraps))
-                except sqlite3.Error as e:
-                    # pydevd_pycharm.settrace(suspend=True, trace_only_current_thread=True)
-                    print(f"Warning: Could not add leftover scrap to database: {e}")
+                index.add(profile_id, profile_name, leftover_full, full_scraps)
 
             if leftover_partial >= MIN_SCRAP_LENGTH:
-                try:
-                    cursor.execute("""
-                        INSERT INTO profiles (profile_id, name, length, quantity, bin)
-                        VALUES (?, ?, ?, ?, ?)
-                        ON CONFLICT(profile_id, length) DO UPDATE
-                        SET quantity = quantity + excluded.quantity
-                    """, (profile_id, profile_name, leftover_partial, partial_scraps, classify_bin(leftover_partial)))
-
-                    # Update bin_summary
-                    cursor.execute("""
-                        INSERT INTO bin_summary (bin, total_quantity)
-                        VALUES (?, ?)
-                        ON CONFLICT(bin) DO UPDATE SET total_quantity = total_quantity + excluded.total_quantity
-                    """, (classify_bin(leftover_partial), partial_scraps))
-                except sqlite3.Error as e:
-                    # pydevd_pycharm.settrace(suspend=True, trace_only_current_thread=True)
-                    print(f"Warning: Could not add leftover scrap to database: {e}")
+                index.add(profile_id, profile_name, leftover_partial, partial_scraps)
 
     allocation_result['remaining_requirement'] = remaining
 
     # If still need more, allocate from new profiles
-    if remaining > 0:
+    if remaining > 0 and allocate_new:
         # Check if new profile can fulfill the requirement
 
         # usable_new_length = NEW_PROFILE_LENGTH - CUTTING_ALLOWANCE
@@ -157,7 +141,8 @@ def best_fit_allocation(required_length: float, required_qty: int, profile_name:
 
         profile_id = get_profile_id_by_name(profile_name)
 
-        pieces_per_new = int(NEW_PROFILE_LENGTH // req_length_ind)
+        new_pattern = cut_pattern(req_length_ind, NEW_PROFILE_LENGTH)
+        pieces_per_new = new_pattern.pieces_per_stock
 
         new_profiles_needed = (remaining + pieces_per_new - 1) // pieces_per_new  # Ceiling division
 
@@ -174,7 +159,7 @@ def best_fit_allocation(required_length: float, required_qty: int, profile_name:
             partial_new_profiles = 1
             partial_new_pieces = remainder
 
-        leftover_per_full = NEW_PROFILE_LENGTH - (pieces_per_new * req_length_ind)
+        leftover_per_full = new_pattern.leftover_full
         leftover_per_partial = NEW_PROFILE_LENGTH - (partial_new_pieces * req_length_ind) if partial_new_profiles > 0 else 0
 
         # Total scrap created
@@ -192,54 +177,255 @@ def best_fit_allocation(required_length: float, required_qty: int, profile_name:
 
 
         if leftover_per_full >= MIN_SCRAP_LENGTH and full_new_profiles > 0:  # Only keep scrap if it's useful
-            # Add leftover as new scrap to database
-            try:
-                cursor.execute("""
-                    INSERT INTO profiles (profile_id, name, length, quantity, bin)
-                    VALUES (?, ?, ?, ?, ?)
-                    ON CONFLICT(profile_id, length) DO UPDATE
-                    SET quantity = quantity + excluded.quantity
-                """, (profile_id, profile_name, leftover_per_full, full_new_profiles, classify_bin(leftover_per_full)))
-
-                # Update bin summary
-                cursor.execute("""
-                    INSERT INTO bin_summary (bin, total_quantity)
-                    VALUES (?, ?)
-                    ON CONFLICT(bin) DO UPDATE
-                    SET total_quantity = total_quantity + excluded.total_quantity
-                """, (classify_bin(leftover_per_full), full_new_profiles))
-            except sqlite3.Error as e:
-                # pydevd_pycharm.settrace(suspend=True, trace_only_current_thread=True)
-                print(f"Warning: Could not add leftover scrap to database: {e}")
+            # Add leftover as new scrap
+            index.add(profile_id, profile_name, leftover_per_full, full_new_profiles)
 
         if leftover_per_partial >= MIN_SCRAP_LENGTH and partial_new_profiles > 0:
-            try:
-                cursor.execute("""
-                    INSERT INTO profiles (profile_id, name, length, quantity, bin)
-                    VALUES (?, ?, ?, ?, ?)
-                    ON CONFLICT(profile_id, length) DO UPDATE
-                    SET quantity = quantity + excluded.quantity
-                """, (profile_id, profile_name, leftover_per_partial, partial_new_profiles, classify_bin(leftover_per_partial)))
-
-                # Update bin summary
-                cursor.execute("""
-                    INSERT INTO bin_summary (bin, total_quantity)
-                    VALUES (?, ?)
-                    ON CONFLICT(bin) DO UPDATE
-                    SET total_quantity = total_quantity + excluded.total_quantity
-                """, (classify_bin(leftover_per_partial), partial_new_profiles))
-            except sqlite3.Error as e:
-                # pydevd_pycharm.settrace(suspend=True, trace_only_current_thread=True)
-                print(f"Warning: Could not add leftover scrap to database: {e}")
+            index.add(profile_id, profile_name, leftover_per_partial, partial_new_profiles)
 
-    try:
-        conn.commit()
-    except sqlite3.Error as e:
-        conn.rollback()
-        raise Exception(f"Database transaction failed: {e}")
+    if owns_index:
+        try:
+            index.flush(conn)
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            raise Exception(f"Database transaction failed: {e}")
 
     return allocation_result
 
+def select_scored_scrap(index, profile_name: str, req_length: float, remaining: int, used_ids):
+    """
+    Score every scrap row that fits one piece and return (profile_id, length, quantity)
+    of the best one, or None. All candidates are scored at once with NumPy:
+    score = leftover of the whole row + gap to the remaining requirement + labor penalty
+    for starting on a profile not yet used by this allocation.
+    """
+    import numpy as np
+
+    lengths, quantities, profile_ids = index.candidates(profile_name, req_length)
+    if len(lengths) == 0:
+        return None
+
+    pieces_per_scrap = lengths // req_length
+    usable_pieces = np.minimum(pieces_per_scrap * quantities, remaining)
+    total_provided = usable_pieces * req_length
+    total_leftover = lengths * quantities - total_provided
+    gap = np.abs(remaining * req_length - total_provided)
+
+    labor_penalty = np.full(len(lengths), LABOR_PENALTY_WEIGHT)
+    for profile_id in used_ids:
+        labor_penalty[profile_ids == profile_id] = 0
+
+    best = int(np.argmin(total_leftover + gap + labor_penalty))
+    return profile_ids[best], float(lengths[best]), int(quantities[best])
+
+def plan_allocation(requirements, index, strategy=ALLOCATION_STRATEGY, workers=ALLOCATION_WORKERS, progress=None,
+                    min_parallel=None):
+    """
+    Allocate requirements against a ScrapIndex without touching the database.
+    Scrap is allocated line by line; whatever is still missing is packed onto
+    shared new profiles per profile name by the cutting-pattern optimizer.
+    Profile names never share scrap, so large cutlists are split by profile
+    name and allocated in a process pool of the given number of workers
+    (None = one per CPU core) once there are at least min_parallel lines
+    (default PARALLEL_MIN_REQUIREMENTS for the strategy). With fewer than two
+    workers or profile names everything runs in-process.
+    progress(done, total) counts one step per line plus one per profile name
+    for packing its shortfall onto new bars. It is called per step in-process
+    and per profile name in the pool; it may raise to stop the run.
+    Returns a list of (requirement, allocation_result) pairs in processing order.
+    """
+    sorted_requirements = sorted(requirements, key=lambda x: x['length'], reverse=True)
+
+    families = {}
+    for pos, req in enumerate(sorted_requirements):
+        families.setdefault(req['profile_name'], []).append(pos)
+
+    total = len(sorted_requirements) + len(families)
+    workers = min(workers or os.cpu_count() or 1, len(families))
+    if min_parallel is None:
+        min_parallel = PARALLEL_MIN_REQUIREMENTS.get(strategy, 0)
+    if workers < 2 or len(sorted_requirements) < min_parallel:
+        results = _plan_family(sorted_requirements, index, strategy, progress=progress)
+        return list(zip(sorted_requirements, results))
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = [None] * len(sorted_requirements)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_plan_family, [sorted_requirements[pos] for pos in positions], index.subset([name]), strategy,
+                        return_index=True)
+            for name, positions in families.items()
+        ]
+        # Single writer: fold each family's inventory back into the shared index
+        done = 0
+        try:
+            for positions, future in zip(families.values(), futures):
+                family_results, family_index = future.result()
+                index.merge(family_index)
+                for pos, result in zip(positions, family_results):
+                    results[pos] = (sorted_requirements[pos], result)
+                done += len(positions) + 1
+                if progress is not None:
+                    progress(done, total)
+        except BaseException:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    return results
+
+def _plan_family(sorted_requirements, index, strategy, return_index=False, progress=None):
+    """Allocate requirements already sorted by length; returns the allocation results in the same order"""
+    results = []
+    total = len(sorted_requirements) + len({req['profile_name'] for req in sorted_requirements})
+    for req in sorted_requirements:
+        try:
+            result = best_fit_allocation(req['length'], req['quantity'], req['profile_name'], None,
+                                         index=index, allocate_new=False, strategy=strategy)
+        except Exception as e:
+            raise Exception(f"Error allocating {req['requirement_type']} "
+                            f"{req['length']}mm x {req['quantity']}pcs: {e}") from e
+        results.append((req, result))
+        if progress is not None:
+            progress(len(results), total)
+
+    pack_progress = None
+    if progress is not None:
+        pack_progress = lambda packed: progress(len(results) + packed, total)
+    allocate_new_profiles(results, index, pack_progress)
+    if progress is not None:
+        # Profile names without a shortfall had nothing to pack
+        progress(total, total)
+    results = [result for _, result in results]
+    return (results, index) if return_index else results
+
+def allocate_batch(requirements, conn, strategy=ALLOCATION_STRATEGY, workers=ALLOCATION_WORKERS, progress=None):
+    """
+    Allocate a whole list of requirements in a single transaction.
+    requirements may be any iterable, e.g. the iter_cutlist() stream.
+    progress(done, total) reports the plan_allocation() steps followed by
+    writing the changes and committing; raising AllocationCancelled from it
+    cancels the run. It is last called before the commit.
+    Returns a list of (requirement, allocation_result) pairs in processing order.
+    If any requirement fails or the run is cancelled, no changes are written
+    and the exception is raised.
+    When the caller already has a transaction open, the allocation runs in a
+    savepoint inside it: the caller's work is neither committed nor rolled
+    back, and the caller commits the whole transaction. That transaction
+    should already hold the write lock, e.g. by having written.
+    """
+    # Longest-first ordering and shared bar packing need the complete demand
+    requirements = list(requirements)
+    plan_progress = None
+    if progress is not None:
+        # plan_allocation() steps, then the flush and the commit
+        steps = len(requirements) + len({req['profile_name'] for req in requirements}) + 2
+        plan_progress = lambda done, total: progress(done, steps)
+    nested = conn.in_transaction
+    try:
+        if nested:
+            conn.execute("SAVEPOINT allocate_batch")
+        else:
+            # Take the write lock up front so the scrap read below cannot go stale
+            conn.execute("BEGIN IMMEDIATE")
+
+        with instrumentation.timer("allocation.load_index"):
+            index = ScrapIndex.load(conn, {req['profile_name'] for req in requirements})
+        with instrumentation.timer("allocation.plan"):
+            results = plan_allocation(requirements, index, strategy, workers, plan_progress)
+
+        with instrumentation.timer("sql.flush"):
+            index.flush(conn)
+        if progress is not None:
+            # Last chance to cancel: nothing is committed yet
+            progress(steps - 1, steps)
+        if nested:
+            conn.execute("RELEASE SAVEPOINT allocate_batch")
+        else:
+            with instrumentation.timer("sql.commit"):
+                conn.commit()
+    except Exception:
+        if not nested:
+            conn.rollback()
+        elif conn.in_transaction:
+            conn.execute("ROLLBACK TO SAVEPOINT allocate_batch")
+            conn.execute("RELEASE SAVEPOINT allocate_batch")
+        raise
+
+    return results
+
+def simulate_allocation(requirements, conn=None, inventory=None, strategy=ALLOCATION_STRATEGY,
+                        workers=ALLOCATION_WORKERS):
+    """
+    Dry run: allocate requirements against a copy-on-write snapshot of the
+    inventory. Nothing is written to the database and the requirements are
+    not marked processed.
+    inventory is a ScrapIndex to reuse across what-ifs; when omitted the
+    inventory is loaded from conn.
+    Returns a dict with the allocation 'results', the resulting 'inventory'
+    rows and the 'changes' a real run would write.
+    """
+    if inventory is None:
+        if conn is None:
+            raise ValueError("Either a connection or an inventory snapshot is required")
+        inventory = ScrapIndex.load(conn, {req['profile_name'] for req in requirements})
+
+    snapshot = inventory.snapshot()
+    results = plan_allocation(requirements, snapshot, strategy, workers)
+
+    return {
+        'results': results,
+        'inventory': snapshot.rows(),
+        'changes': snapshot.changes(),
+    }
+
+def allocate_new_profiles(results, index, progress=None):
+    """
+    Cut the remaining requirements from new profiles, mixing all lengths of the
+    same profile name on shared bars. Updates the allocation results in place
+    and adds the useful leftovers to the index.
+    progress(packed) is called after each profile name is packed.
+    """
+    pending = {}
+    for i, (req, result) in enumerate(results):
+        if result['remaining_requirement'] > 0:
+            pending.setdefault(req['profile_name'], []).append(i)
+
+    for packed, (profile_name, positions) in enumerate(pending.items(), 1):
+        cutting_allowance = get_cutting_allowance(profile_name)
+        pieces = [(results[i][1]['required_length'] + cutting_allowance, results[i][1]['remaining_requirement'], i)
+                  for i in positions]
+        bars = pack_bars(pieces)
+        profile_id = get_profile_id_by_name(profile_name)
+
+        # Group identical bars into patterns; each bar is credited to the line of its longest piece
+        patterns = {}
+        for bar in bars:
+            key = tuple(bar)
+            patterns[key] = patterns.get(key, 0) + 1
+
+        for i in positions:
+            result = results[i][1]
+            result['allocated_from_new'] = result['remaining_requirement']
+
+        for bar, count in patterns.items():
+            owner = results[bar[0][1]][1]
+            leftover = NEW_PROFILE_LENGTH - sum(length for length, _ in bar)
+            owner['new_profiles_needed'] += count
+            owner.setdefault('cutting_patterns', []).append({
+                'profile_id': profile_id,
+                'pieces': [results[i][1]['required_length'] for _, i in bar],
+                'bars': count,
+                'leftover': leftover
+            })
+
+            if leftover >= MIN_SCRAP_LENGTH:
+                index.add(profile_id, profile_name, leftover, count)
+
+        if progress is not None:
+            progress(packed)
+
 def print_allocation_result(result):
     
     """
@@ -278,99 +464,11 @@ def print_allocation_result(result):
             
             print(f"    Total scrap: {scrap['total_waste']}mm")
 
+    if result.get('cutting_patterns'):
+        print("  ✂  Cutting patterns on new profiles:")
+        for pattern in result['cutting_patterns']:
+            cuts = " + ".join(f"{length}mm" for length in pattern['pieces'])
+            print(f"    - {pattern['bars']} × [{cuts}], leftover {pattern['leftover']}mm")
+
     if result.get('new_profiles_needed', 0) > 0:
         print(f"  🆕 New profiles needed: {result['new_profiles_needed']}")
-
-
-# ------------------------------------------------------------------------------------------------------------------ #
-
-    # remaining = required_qty
-    # req_length = required_length + CUTTING_ALLOWANCE
-    #
-    # while remaining > 0:
-    #
-    #     # Fetch all viable scraps (ascending length)
-    #     cursor.execute("""
-    #         SELECT profile_id, length, quantity
-    #         FROM profiles
-    #         WHERE name = ? AND length >= ?
-    #         ORDER BY length ASC
-    #     """, (profile_name, req_length))
-    #
-    #     candidates = cursor.fetchall()
-    #     if not candidates:
-    #         break  # fallback to new profiles
-    #
-    #     best_score = float("inf")
-    #     best_candidate = None
-    #
-    #     for profile_id, scrap_length, scrap_qty in candidates:
-    #         pieces_per_scrap = scrap_length // req_length
-    #         if pieces_per_scrap == 0:
-    #             continue
-    #
-    #         # Max pieces we can cut from this scrap
-    #         usable_pieces = min(pieces_per_scrap * scrap_qty, remaining)
-    #         total_provided = usable_pieces * req_length
-    #         total_leftover = (scrap_length * scrap_qty) - total_provided
-    #
-    #         # Gap relative to total remaining requirement
-    #         gap = abs(remaining * req_length - total_provided)
-    #
-    #         # Labor penalty if this scrap hasn't been used yet in this allocation
-    #         already_used = any(s['profile_id'] == profile_id for s in allocation_result['scrap_used'])
-    #         labor_penalty_weight = 0.5
-    #         labor_penalty = labor_penalty_weight if not already_used else 0
-    #
-    #         score = total_leftover + gap + labor_penalty
-    #
-    #         if score < best_score:
-    #             best_score = score
-    #             best_candidate = (profile_id, scrap_length, scrap_qty)
-    #
-    #     if best_candidate is None:
-    #         break  # no usable scrap
-    #
-    #     # Allocate from best candidate
-    #     profile_id, scrap_length, scrap_qty = best_candidate
-    #     pieces_per_scrap = scrap_length // req_length
-    #     scrap_needed = min((remaining + pieces_per_scrap - 1) // pieces_per_scrap, scrap_qty)
-    #     pieces_obtained = min(scrap_needed * pieces_per_scrap, remaining)
-    #
-    #     # Record allocation
-    #     allocation_result['allocated_from_scrap'] += scrap_needed
-    #     allocation_result['scrap_used'].append({
-    #         'profile_id': profile_id,
-    #         'scrap_length': scrap_length,
-    #         'scrap_qty_used': scrap_needed,
-    #         'pieces_per_scrap': pieces_per_scrap,
-    #         'total_pieces': pieces_obtained,
-    #         'total_waste': (scrap_length * scrap_needed) - (pieces_obtained * req_length)
-    #     })
-    #
-    #     # Update database
-    #     new_scrap_qty = scrap_qty - scrap_needed
-    #     if new_scrap_qty > 0:
-    #         cursor.execute("""
-    #             UPDATE profiles
-    #             SET quantity = ?
-    #             WHERE profile_id = ? AND length = ?
-    #         """, (new_scrap_qty, profile_id, scrap_length))
-    #     else:
-    #         cursor.execute("""
-    #             DELETE FROM profiles
-    #             WHERE profile_id = ? AND length = ?
-    #         """, (profile_id, scrap_length))
-    #
-    #     # Insert leftover scrap if >= MIN_SCRAP_LENGTH
-    #     leftover_per_scrap = scrap_length - (pieces_per_scrap * req_length)
-    #     if leftover_per_scrap >= MIN_SCRAP_LENGTH:
-    #         cursor.execute("""
-    #             INSERT INTO profiles (profile_id, name, length, quantity, bin)
-    #             VALUES (?, ?, ?, ?, ?)
-    #             ON CONFLICT(profile_id, length) DO UPDATE
-    #             SET quantity = quantity + excluded.quantity
-    #         """, (profile_id, profile_name, leftover_per_scrap, scrap_needed,
-    #               classify_bin(leftover_per_scrap)))
-    #
-    #     remaining -= pieces_obtained
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""
+Headless cutlist processing for scripts and scheduled jobs.
+
+    python batch.py cutlists/ extra.xlsx --db inventory.db --output plan.json
+    python batch.py cutlists/ --output plan.csv --quiet
+
+Every file is parsed and allocated against the inventory database in its own
+transaction, so a failing file leaves the inventory as it was and the batch
+moves on to the next one. The allocation plan is written as JSON (plan rows
+plus the summary) or CSV (plan rows only); the summary is always printed.
+--quiet skips the per-line allocation report and reports throughput instead.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+from config import CUTLIST_EXTENSIONS, DB_PATH
+
+PLAN_COLUMNS = ['source_file', 'sheet', 'row_index', 'model', 'requirement_type', 'profile_name', 'length',
+                'quantity', 'allocated_from_scrap', 'allocated_from_new', 'remaining_requirement',
+                'new_profiles_needed', 'scrap_used']
+
+
+def collect_files(paths: List[str]) -> List[str]:
+    """Expand directories into the cutlist files they contain, keeping the given order"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if name.lower().endswith(CUTLIST_EXTENSIONS) and not name.startswith('~$'))
+        else:
+            files.append(path)
+    return files
+
+
+def plan_rows(file_path: str, results) -> List[Dict]:
+    """One plan row per requirement line"""
+    rows = []
+    for req, result in results:
+        rows.append({
+            'source_file': os.path.basename(file_path),
+            'sheet': req.get('sheet', ''),
+            'row_index': req['row_index'],
+            'model': req['model'],
+            'requirement_type': req['requirement_type'],
+            'profile_name': req['profile_name'],
+            'length': req['length'],
+            'quantity': req['quantity'],
+            'allocated_from_scrap': result['allocated_from_scrap'],
+            'allocated_from_new': result['allocated_from_new'],
+            'remaining_requirement': result['remaining_requirement'],
+            'new_profiles_needed': result['new_profiles_needed'],
+            'scrap_used': [
+                {'profile_id': scrap['profile_id'], 'scrap_length': scrap['scrap_length'],
+                 'scrap_qty_used': scrap['scrap_qty_used'], 'total_pieces': scrap['total_pieces']}
+                for scrap in result['scrap_used']
+            ],
+        })
+    return rows
+
+
+def process_file(conn, file_path: str, sheet_names=None, verbose: bool = True) -> Dict:
+    """Parse and allocate one cutlist; returns its summary and plan rows"""
+    from excel_processor import process_requirements
+    from requirements_manager import parse_file
+
+    start = time.perf_counter()
+    requirements = parse_file(file_path, sheet_names)
+    summary = process_requirements(requirements, conn, verbose=verbose)
+    return {
+        'file': file_path,
+        'status': 'ok',
+        'requirements': len(requirements),
+        'total_new_profiles': summary['total_new_profiles'],
+        'per_profile_new': summary['per_profile_new'],
+        'seconds': time.perf_counter() - start,
+        'plan': plan_rows(file_path, summary['results']),
+    }
+
+
+def run_batch(paths: List[str], db_path: str = DB_PATH, sheet_names=None, verbose: bool = True) -> Dict:
+    """Process every cutlist in paths against the database at db_path"""
+    from database import ConnectionManager, setup_database
+
+    files = collect_files(paths)
+    setup_database(db_path=db_path).close()
+    manager = ConnectionManager(db_path)
+
+    start = time.perf_counter()
+    reports = []
+    try:
+        for file_path in files:
+            try:
+                with manager.write() as conn:
+                    reports.append(process_file(conn, file_path, sheet_names, verbose))
+            except Exception as e:
+                print(f"Error processing {file_path}: {e}")
+                reports.append({'file': file_path, 'status': 'failed', 'error': str(e), 'plan': []})
+    finally:
+        manager.close()
+    elapsed = time.perf_counter() - start
+
+    per_profile_new = {}
+    for report in reports:
+        for profile, count in report.get('per_profile_new', {}).items():
+            per_profile_new[profile] = per_profile_new.get(profile, 0) + count
+    processed = [report for report in reports if report['status'] == 'ok']
+    requirements = sum(report['requirements'] for report in processed)
+
+    return {
+        'summary': {
+            'files': len(files),
+            'processed': len(processed),
+            'failed': len(files) - len(processed),
+            'requirements': requirements,
+            'total_new_profiles': sum(report['total_new_profiles'] for report in processed),
+            'per_profile_new': per_profile_new,
+            'seconds': elapsed,
+            'files_per_second': len(files) / elapsed if elapsed > 0 else None,
+            'requirements_per_second': requirements / elapsed if elapsed > 0 else None,
+        },
+        'files': [{key: value for key, value in report.items() if key != 'plan'} for report in reports],
+        'plan': [row for report in reports for row in report['plan']],
+    }
+
+
+def write_plan(batch: Dict, output: str):
+    """Write the batch result as JSON, or the plan rows as CSV when output ends with .csv"""
+    if output.lower().endswith('.csv'):
+        with open(output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=PLAN_COLUMNS)
+            writer.writeheader()
+            for row in batch['plan']:
+                scraps = ";".join(f"{scrap['profile_id']}:{scrap['scrap_length']}x{scrap['scrap_qty_used']}"
+                                  for scrap in row['scrap_used'])
+                writer.writerow(dict(row, scrap_used=scraps))
+    else:
+        with open(output, 'w') as f:
+            json.dump(batch, f, indent=2)
+            f.write("\n")
+
+
+def print_summary(summary: Dict, throughput: bool):
+    print("=" * 80)
+    print(f"Files: {summary['processed']} processed, {summary['failed']} failed")
+    print(f"Requirements: {summary['requirements']}")
+    print(f"Total new profiles: {summary['total_new_profiles']}")
+    for profile, count in summary['per_profile_new'].items():
+        print(f"  {profile}: {count}")
+    if throughput and summary['files_per_second'] is not None:
+        print(f"Throughput: {summary['files_per_second']:.2f} files/s, "
+              f"{summary['requirements_per_second']:.0f} requirements/s in {summary['seconds']:.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Process cutlists against the scrap inventory without the GUI")
+    parser.add_argument("paths", nargs="+", help="cutlist files or directories of cutlists")
+    parser.add_argument("--db", default=DB_PATH, help="inventory database (created if missing, never reset)")
+    parser.add_argument("--output", help="write the plan to this .json or .csv file")
+    parser.add_argument("--all-sheets", action="store_true",
+                        help="read every cutlist sheet of each workbook instead of only Sheet1")
+    parser.add_argument("--quiet", action="store_true",
+                        help="throughput mode: no per-line allocation report, files per second in the summary")
+    args = parser.parse_args(argv)
+
+    from requirements_manager import CUTLIST_SHEET
+
+    batch = run_batch(args.paths, args.db, None if args.all_sheets else [CUTLIST_SHEET], verbose=not args.quiet)
+    if args.output:
+        write_plan(batch, args.output)
+    print_summary(batch['summary'], throughput=args.quiet)
+    return 1 if batch['summary']['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
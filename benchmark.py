@@ -0,0 +1,302 @@
+"""
+Synthetic benchmarks for cutlist ingestion, allocation and the database helpers.
+
+    python benchmark.py --inventory 1000 100000 --lines 10 1000 --output bench.json
+
+Inventories and cutlists are generated from a fixed seed so runs on different
+versions are comparable. Results are written as JSON.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from config import PROFILE_NAMES, classify_bin, get_profile_id_by_name
+
+F75_MODELS = ["KSLAD F-75 SINGLE DEFLECTION", "KRLAD F-75 SINGLE DEFLECTION"]
+F100_MODELS = ["KSLAD F-100 SINGLE DEFLECTION", "KRLAD F-100 SINGLE DEFLECTION"]
+
+# (quantity column, length column) per component, in the order of the cutlist sheet
+COMPONENT_COLUMNS = [
+    ("FRAME_QTY", "FRAME LENGTH"),
+    ("IV_QTY", "INNER VANE"),
+    ("PCE_QTY", "PCE"),
+    ("VCD_QTY", "VCD"),
+]
+
+
+def generate_inventory(conn, rows: int, seed: int = 0):
+    """Fill the profiles table with rows unique (profile, length) remnants between 1000 and 6000 mm"""
+    rng = random.Random(seed)
+    names = PROFILE_NAMES
+    lengths_per_name = 50001  # 1000.0 to 6000.0 mm in 0.1 mm steps
+    if rows > len(names) * lengths_per_name:
+        raise ValueError(f"At most {len(names) * lengths_per_name} unique remnant rows can be generated")
+
+    records = []
+    for code in rng.sample(range(len(names) * lengths_per_name), rows):
+        name = names[code % len(names)]
+        length = 1000 + (code // len(names)) / 10
+        records.append((get_profile_id_by_name(name), name, length, rng.randint(1, 5), classify_bin(length)))
+
+    conn.executemany("""
+        INSERT INTO profiles (profile_id, name, length, quantity, bin)
+        VALUES (?, ?, ?, ?, ?)
+    """, records)
+    conn.commit()
+
+
+def generate_cutlist_frame(lines: int, seed: int = 0, f100_share: float = 0.5):
+    """Cutlist rows in the Sheet1 layout, mixing F-75 and F-100 models"""
+    import pandas as pd
+
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(lines):
+        models = F100_MODELS if rng.random() < f100_share else F75_MODELS
+        row = {"MODEL": rng.choice(models)}
+        for qty_column, length_column in COMPONENT_COLUMNS:
+            row[qty_column] = rng.choice([0, 1, 2, 2, 4, 6, 8])
+            row[length_column] = rng.randint(2000, 58000) / 20
+        rows.append(row)
+    return pd.DataFrame(rows, columns=["MODEL"] + [column for pair in COMPONENT_COLUMNS for column in pair])
+
+
+def generate_cutlist(path: str, lines: int, seed: int = 0, f100_share: float = 0.5):
+    """Write a synthetic cutlist as a workbook, or as CSV or Parquet depending on the extension"""
+    df = generate_cutlist_frame(lines, seed, f100_share)
+    if path.endswith(".csv"):
+        df.to_csv(path, index=False)
+    elif path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_excel(path, sheet_name="Sheet1", index=False)
+
+
+def cutlist_formats():
+    """File formats the cutlist benchmark can write and read here; Parquet needs pyarrow or fastparquet"""
+    formats = ["xlsx", "csv"]
+    for engine in ("pyarrow", "fastparquet"):
+        try:
+            __import__(engine)
+        except ImportError:
+            continue
+        formats.append("parquet")
+        break
+    return formats
+
+
+def timed(func, repeat: int, setup=None):
+    """Run func repeat times and return the wall-clock seconds of each run; setup is not timed"""
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(name: str, params: dict, timings):
+    return {
+        "name": name,
+        "params": params,
+        "repeat": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Modules timed by import_benchmarks(); ui needs Dear PyGui
+STARTUP_MODULES = ["config", "database", "allocation", "excel_processor", "requirements_manager", "main"]
+
+
+def import_benchmarks(modules=STARTUP_MODULES, repeat=3):
+    """Wall-clock seconds to start a fresh interpreter and import each module"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    baseline = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True, cwd=here)
+        baseline.append(time.perf_counter() - start)
+    results.append(summarize("startup", {"module": None}, baseline))
+
+    for module in modules:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, "-c", f"import {module}"], cwd=here,
+                                       capture_output=True)
+            timings.append(time.perf_counter() - start)
+            if completed.returncode != 0:
+                break
+        if completed.returncode == 0:
+            results.append(summarize("startup", {"module": module}, timings))
+    return results
+
+
+def run_benchmarks(inventory_sizes, line_counts, repeat=3, seed=0, workdir=None):
+    """Run every benchmark for each inventory size and cutlist length, returning the result records"""
+    from allocation import best_fit_allocation
+    from database import add_profile, get_all_profiles, get_profiles_by_name, setup_database
+    from excel_processor import parse_cutlist, process_requirements
+
+    if workdir is None:
+        with tempfile.TemporaryDirectory(prefix="scrap_bench_") as tmp:
+            return run_benchmarks(inventory_sizes, line_counts, repeat, seed, tmp)
+
+    results = []
+    work_db = os.path.join(workdir, "work.db")
+
+    cutlists = {}
+    for lines in line_counts:
+        # The same cutlist in every format, parsed side by side
+        for fmt in cutlist_formats():
+            path = os.path.join(workdir, f"cutlist_{lines}.{fmt}")
+            generate_cutlist(path, lines, seed)
+            if fmt == "xlsx":
+                with contextlib.redirect_stdout(io.StringIO()):
+                    cutlists[lines] = (path, parse_cutlist(path))
+            results.append(summarize("parse_cutlist", {"lines": lines, "format": fmt},
+                                     timed(lambda: parse_cutlist(path), repeat)))
+
+    for rows in inventory_sizes:
+        template = os.path.join(workdir, f"inventory_{rows}.db")
+        if os.path.exists(template):
+            os.remove(template)
+        conn = setup_database(reset=True, db_path=template)
+        generate_inventory(conn, rows, seed)
+        conn.close()
+
+        def fresh_connection():
+            shutil.copyfile(template, work_db)
+            return (sqlite3.connect(work_db),)
+
+        for lines, (_, requirements) in cutlists.items():
+            params = {"inventory_rows": rows, "lines": lines, "requirements": len(requirements)}
+
+            def allocate_each(conn):
+                for req in requirements:
+                    best_fit_allocation(req["length"], req["quantity"], req["profile_name"], conn)
+                conn.close()
+
+            def process_all(conn):
+                process_requirements([dict(req) for req in requirements], conn)
+                conn.close()
+
+            results.append(summarize("best_fit_allocation", params,
+                                     timed(allocate_each, repeat, fresh_connection)))
+            results.append(summarize("process_requirements", params,
+                                     timed(process_all, repeat, fresh_connection)))
+
+        params = {"inventory_rows": rows}
+        rng = random.Random(seed)
+        additions = [(rng.choice(PROFILE_NAMES), rng.randint(1000, 6000), rng.randint(1, 5)) for _ in range(200)]
+
+        def add_all(conn):
+            for name, length, quantity in additions:
+                add_profile(conn, name, length, quantity)
+            conn.close()
+
+        def query(func, *args):
+            def run(conn):
+                func(conn, *args)
+                conn.close()
+            return run
+
+        results.append(summarize("add_profile", dict(params, calls=len(additions)),
+                                 timed(add_all, repeat, fresh_connection)))
+        results.append(summarize("get_all_profiles", params,
+                                 timed(query(get_all_profiles), repeat, fresh_connection)))
+        results.append(summarize("get_profiles_by_name", params,
+                                 timed(query(get_profiles_by_name, "VCD PROFILE LAD F-75"), repeat,
+                                       fresh_connection)))
+
+    return results
+
+
+def parallel_benchmarks(inventory_sizes, line_counts, repeat=3, seed=0):
+    """
+    plan_allocation in-process and in process pools of 2 and of one worker per
+    core, for both strategies; the crossover backs PARALLEL_MIN_REQUIREMENTS
+    """
+    from allocation import ALLOCATION_STRATEGIES, plan_allocation
+    from database import setup_database
+    from excel_processor import requirements_from_frame
+    from scrap_index import ScrapIndex
+
+    requirements, _ = requirements_from_frame(generate_cutlist_frame(max(line_counts), seed))
+    results = []
+    for rows in inventory_sizes:
+        conn = setup_database(reset=True, db_path=":memory:")
+        generate_inventory(conn, rows, seed)
+        for lines in line_counts:
+            batch = requirements[:lines]
+            names = {req["profile_name"] for req in batch}
+            for strategy in ALLOCATION_STRATEGIES:
+                for workers in sorted({1, 2, os.cpu_count() or 1}):
+                    params = {"inventory_rows": rows, "lines": len(batch), "strategy": strategy, "workers": workers}
+                    results.append(summarize("plan_allocation", params, timed(
+                        lambda index: plan_allocation(batch, index, strategy, workers, min_parallel=0), repeat,
+                        lambda: (ScrapIndex.load(conn, names),))))
+        conn.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cutlist ingestion and scrap allocation")
+    parser.add_argument("--inventory", type=int, nargs="+", default=[1000, 10000],
+                        help="remnant rows in the synthetic inventory (up to 1,000,000)")
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 100],
+                        help="rows in the synthetic cutlist (up to 10,000)")
+    parser.add_argument("--plan-lines", type=int, nargs="+", default=[1000, 10000],
+                        help="requirement lines for the in-process vs process pool plan_allocation comparison")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": import_benchmarks(repeat=args.repeat)
+                   + run_benchmarks(args.inventory, args.lines, args.repeat, args.seed)
+                   + parallel_benchmarks(args.inventory, args.plan_lines, args.repeat, args.seed),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,91 @@
+"""
+Merge identical requirement lines before allocation and split the results back.
+
+A cutlist produces one requirement per (row, component), so repeated rows ask
+for the same profile and length many times. coalesce_requirements() turns them
+into one demand per (profile_name, length) that remembers its source rows, and
+split_results() hands the pieces of each aggregated allocation back to those
+rows in order: scrap pieces first, then pieces cut from new profiles.
+"""
+from typing import Dict, List, Tuple
+
+
+def coalesce_requirements(requirements: List[Dict]) -> List[Dict]:
+    """
+    One requirement per (profile_name, length), in order of first appearance.
+    The quantity is the sum over all source rows, which are kept in 'sources'.
+    """
+    groups = {}
+    for req in requirements:
+        key = (req['profile_name'], req['length'])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = dict(req, quantity=0, sources=[])
+        group['quantity'] += req['quantity']
+        group['sources'].append(req)
+    return list(groups.values())
+
+
+def split_results(results: List[Tuple[Dict, Dict]]) -> List[Tuple[Dict, Dict]]:
+    """
+    Turn (coalesced requirement, result) pairs into (source row, result) pairs.
+    Counts add up to the aggregated result. A scrap or new bar is counted for
+    the row that gets its first piece. Cutting patterns and scrap created stay
+    with the first row of each group.
+    """
+    split = []
+    for group, result in results:
+        rows = group.get('sources', [group])
+        if len(rows) == 1:
+            split.append((rows[0], result))
+            continue
+
+        # Pieces taken so far from each scrap entry, and from new profiles
+        scrap_taken = [0] * len(result['scrap_used'])
+        new_taken = 0
+        new_total = result['allocated_from_new']
+        entry = 0
+        for i, row in enumerate(rows):
+            wanted = row['quantity']
+            row_result = {
+                'required_length': result['required_length'],
+                'required_qty': wanted,
+                'allocated_from_scrap': 0,
+                'allocated_from_new': 0,
+                'scrap_used': [],
+                'scrap_created': result['scrap_created'] if i == 0 else [],
+                'remaining_requirement': 0,
+                'new_profiles_needed': 0
+            }
+            if i == 0 and result.get('cutting_patterns'):
+                row_result['cutting_patterns'] = result['cutting_patterns']
+
+            while wanted > 0 and entry < len(result['scrap_used']):
+                scrap = result['scrap_used'][entry]
+                start = scrap_taken[entry]
+                taken = min(wanted, scrap['total_pieces'] - start)
+                per_bar = scrap['pieces_per_scrap']
+                bars = -(-(start + taken) // per_bar) - -(-start // per_bar)
+                scrap_taken[entry] += taken
+                wanted -= taken
+                last = scrap_taken[entry] == scrap['total_pieces']
+                row_result['allocated_from_scrap'] += bars
+                row_result['scrap_used'].append(dict(scrap, scrap_qty_used=bars, total_pieces=taken,
+                                                     total_waste=scrap['total_waste'] if last else 0))
+                if last:
+                    entry += 1
+
+            # Like the aggregate, remaining_requirement is what scrap could not cover
+            row_result['remaining_requirement'] = wanted
+
+            from_new = min(wanted, new_total - new_taken)
+            if from_new > 0:
+                # Share the new bars in proportion to the pieces, rounding on the running total
+                needed = result['new_profiles_needed']
+                row_result['new_profiles_needed'] = (round((new_taken + from_new) * needed / new_total)
+                                                     - round(new_taken * needed / new_total))
+                row_result['allocated_from_new'] = from_new
+                new_taken += from_new
+
+            split.append((row, row_result))
+    return split
@@ -3,6 +3,48 @@ CUTTING_ALLOWANCE = 20  # mm
 FRAME_CUTTING_ALLOWANCE = 50
 NEW_PROFILE_LENGTH = 6000  # mm
 MIN_SCRAP_LENGTH = 1000  # mm - minimum length to keep as scrap
+ALLOCATION_STRATEGY = "best_fit"  # "best_fit" or "scored" - how scrap rows are picked
+CUTTING_TIME_BUDGET = 0.2  # seconds - time the cutting-pattern optimizer may spend per profile
+ALLOCATION_WORKERS = None  # processes for allocating profile families in parallel, None = one per CPU core
+# Lines per strategy below which allocation stays in-process. Handing families to the pool costs
+# about 30-100 ms plus ~20 us per line; best_fit allocates a line in ~10-30 us and scored in
+# ~40-300 us, so the pool only pays beyond these sizes (benchmark.py "plan_allocation" records)
+PARALLEL_MIN_REQUIREMENTS = {"best_fit": 10000, "scored": 2000}
+COALESCE_REQUIREMENTS = True  # allocate identical (profile, length) lines as one demand
+CUTLIST_CHUNK_ROWS = 5000  # sheet rows converted at a time when streaming a cutlist
+STREAMING_MIN_FILE_SIZE = 5 * 1024 * 1024  # bytes - larger .xlsx cutlists are streamed instead of read whole
+CUTLIST_EXTENSIONS = ('.xlsx', '.xlsm', '.xls', '.csv', '.parquet', '.pq')  # cutlist formats the GUI, batch CLI and watcher accept
+
+DB_PATH = "inventory.db"
+
+WATCH_POLL_INTERVAL = 2.0  # seconds between scans of the watched folder
+WATCH_SETTLE_SECONDS = 5.0  # a file must keep its size and mtime this long before it is read
+WATCH_QUEUE_SIZE = 4  # parsed cutlists waiting for allocation; the scanner pauses when full
+WATCH_MAX_ATTEMPTS = 3  # tries per cutlist content before a failing file is left alone until it changes
+
+PARSE_CACHE_DIR = ".parse_cache"  # parsed cutlists, keyed by file content; None disables the cache
+PARSE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # least recently used entries are evicted beyond this size
+
+# PRAGMAs applied to the long-lived connections handed out by database.ConnectionManager
+SQLITE_PROFILE = "default"
+SQLITE_PROFILES = {
+    "default": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,  # KiB, 64 MB
+        "mmap_size": 268435456,  # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,  # ms
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16384,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+}
 
 PROFILE_MAP = {
     "K11I001007": "P.C.E. PROFILE LAD F-75",
@@ -48,6 +90,45 @@ PRODUCTS = {
     ],
 }
 
+# Cutlist layout per product family. A row whose MODEL contains one of the
+# model_patterns gives one requirement per component with a quantity and a
+# length above 0; the allowance is added to each piece when cutting.
+PRODUCT_SCHEMAS = {
+    "LAD F-75": {
+        "model_patterns": ["KSLAD F-75", "KRLAD F-75"],
+        "components": [
+            {"type": "FRAME", "qty_column": "FRAME_QTY", "length_column": "FRAME LENGTH",
+             "profile": "FRAME PROFILE FOR LAD F-75", "allowance": FRAME_CUTTING_ALLOWANCE},
+            {"type": "INNER VANE", "qty_column": "IV_QTY", "length_column": "INNER VANE",
+             "profile": "INNERVANE PROFILE LAD F-75", "allowance": CUTTING_ALLOWANCE},
+            {"type": "PCE", "qty_column": "PCE_QTY", "length_column": "PCE",
+             "profile": "P.C.E. PROFILE LAD F-75", "allowance": CUTTING_ALLOWANCE},
+            {"type": "VCD", "qty_column": "VCD_QTY", "length_column": "VCD",
+             "profile": "VCD PROFILE LAD F-75", "allowance": CUTTING_ALLOWANCE},
+        ],
+    },
+    "LAD F-100": {
+        "model_patterns": ["KSLAD F-100", "KRLAD F-100"],
+        "components": [
+            {"type": "FRAME", "qty_column": "FRAME_QTY", "length_column": "FRAME LENGTH",
+             "profile": "FRAME PROFILE LAD F-100", "allowance": FRAME_CUTTING_ALLOWANCE},
+            {"type": "INNER VANE", "qty_column": "IV_QTY", "length_column": "INNER VANE",
+             "profile": "INNERVANE PROFILE LAD F-100", "allowance": CUTTING_ALLOWANCE},
+            {"type": "PCE", "qty_column": "PCE_QTY", "length_column": "PCE",
+             "profile": "PCE PROFILE LAD F-100", "allowance": CUTTING_ALLOWANCE},
+            {"type": "VCD", "qty_column": "VCD_QTY", "length_column": "VCD",
+             "profile": "VCD PROFILE LAD F-100", "allowance": CUTTING_ALLOWANCE},
+        ],
+    },
+}
+
+# profile name -> cutting allowance declared by the product schemas
+PROFILE_ALLOWANCES = {
+    component["profile"]: component["allowance"]
+    for schema in PRODUCT_SCHEMAS.values()
+    for component in schema["components"]
+}
+
 PROFILE_NAMES = list(PROFILE_MAP.values())
 
 def get_profile_id_by_name(profile_name: str) -> str:
@@ -62,10 +143,8 @@ def get_profile_name_by_id(profile_id: str) -> str:
     return PROFILE_MAP.get(profile_id, None)
 
 def get_cutting_allowance(profile_name: str):
-    if profile_name == ("FRAME PROFILE FOR LAD F-75" or "FRAME PROFILE LAD F-100"):
-        return FRAME_CUTTING_ALLOWANCE
-    else:
-        return CUTTING_ALLOWANCE
+    """Cutting allowance of a profile as declared in PRODUCT_SCHEMAS, CUTTING_ALLOWANCE otherwise"""
+    return PROFILE_ALLOWANCES.get(profile_name, CUTTING_ALLOWANCE)
 
 def classify_bin(length: float) -> str:
     """Classify profiles into bins based on length"""
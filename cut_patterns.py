@@ -0,0 +1,13 @@
+from collections import namedtuple
+
+CutPattern = namedtuple('CutPattern', ['pieces_per_stock', 'leftover_full'])
+
+
+def cut_pattern(piece_length, stock_length) -> CutPattern:
+    """
+    How a stock length is cut into pieces of one length (cutting allowance included):
+    pieces per stock and the leftover when cut full.
+    """
+    pieces_per_stock = int(stock_length // piece_length)
+    leftover_full = stock_length - (pieces_per_stock * piece_length)
+    return CutPattern(pieces_per_stock, leftover_full)
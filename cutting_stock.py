@@ -0,0 +1,92 @@
+import time
+from bisect import bisect_left, insort
+from typing import Hashable, List, Sequence, Tuple
+
+from config import CUTTING_TIME_BUDGET, NEW_PROFILE_LENGTH
+import instrumentation
+
+
+@instrumentation.timed("allocation.pack_bars")
+def pack_bars(pieces: Sequence[Tuple[float, int, Hashable]], stock_length: float = NEW_PROFILE_LENGTH,
+              time_budget: float = CUTTING_TIME_BUDGET) -> List[List[Tuple[float, Hashable]]]:
+    """
+    Pack pieces of mixed lengths onto as few stock bars as possible.
+    pieces is a list of (length including cutting allowance, quantity, tag).
+    Returns one list of (length, tag) per bar, longest piece first.
+
+    Uses best-fit decreasing, then spends up to time_budget seconds emptying
+    the least filled bar by moving and swapping its pieces into other bars.
+    """
+    items = []
+    for length, qty, tag in pieces:
+        if length > stock_length:
+            raise ValueError(f"Piece length ({length}mm) exceeds stock length ({stock_length}mm)")
+        items.extend([(length, tag)] * int(qty))
+    if not items:
+        return []
+    items.sort(key=lambda item: item[0], reverse=True)
+
+    # Best-fit decreasing: put each piece in the bar with the smallest residual that still fits
+    bars = []
+    residuals = []  # sorted (residual, bar number)
+    for length, tag in items:
+        pos = bisect_left(residuals, (length, -1))
+        if pos < len(residuals):
+            residual, bar_no = residuals.pop(pos)
+            bars[bar_no].append((length, tag))
+            insort(residuals, (residual - length, bar_no))
+        else:
+            bars.append([(length, tag)])
+            insort(residuals, (stock_length - length, len(bars) - 1))
+
+    total_length = sum(length for length, _ in items)
+    lower_bound = -(-total_length // stock_length)
+    deadline = time.perf_counter() + time_budget
+    while len(bars) > lower_bound and time.perf_counter() < deadline:
+        if not _improve(bars, stock_length):
+            break
+
+    for bar in bars:
+        bar.sort(key=lambda item: item[0], reverse=True)
+    return bars
+
+
+def _improve(bars, stock_length) -> bool:
+    """Move or swap pieces out of the least filled bar. Returns False when nothing changed."""
+    fills = [sum(length for length, _ in bar) for bar in bars]
+    weakest = min(range(len(bars)), key=fills.__getitem__)
+    target = bars[weakest]
+    changed = False
+
+    # Move whole pieces into the bar they fit most tightly
+    for piece in sorted(target, key=lambda item: item[0], reverse=True):
+        best, best_residual = None, None
+        for bar_no, fill in enumerate(fills):
+            residual = stock_length - fill - piece[0]
+            if bar_no != weakest and residual >= 0 and (best is None or residual < best_residual):
+                best, best_residual = bar_no, residual
+        if best is not None:
+            target.remove(piece)
+            bars[best].append(piece)
+            fills[best] += piece[0]
+            fills[weakest] -= piece[0]
+            changed = True
+
+    if not target:
+        del bars[weakest]
+        return True
+    if changed:
+        return True
+
+    # Swap a longer piece out of the weakest bar for a shorter one from another bar
+    for piece in sorted(target, key=lambda item: item[0], reverse=True):
+        for bar_no, bar in enumerate(bars):
+            if bar_no == weakest:
+                continue
+            slack = stock_length - fills[bar_no]
+            for i, other in enumerate(bar):
+                if other[0] < piece[0] <= other[0] + slack:
+                    bar[i] = piece
+                    target[target.index(piece)] = other
+                    return True
+    return False
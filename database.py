@@ -1,19 +1,130 @@
 import sqlite3
+import threading
+from contextlib import contextmanager
 from typing import List, Tuple, Optional
-from config import classify_bin, get_profile_id_by_name
+from config import DB_PATH, SQLITE_PROFILE, SQLITE_PROFILES, classify_bin, get_profile_id_by_name
+import instrumentation
 
-def get_connection(db_path="inventory.db"):
+def get_connection(db_path=DB_PATH):
     """Get database connection"""
-    return sqlite3.connect(db_path)
+    return instrumentation.connect(db_path)
 
-def setup_database(reset=False):
+class ConnectionManager:
+    """
+    Long-lived connections to one database file with the PRAGMAs of a profile
+    from config.SQLITE_PROFILES applied. There is one shared write connection,
+    guarded by a lock, and one read-only connection per thread. In WAL mode
+    readers see the last committed state and never wait for a writer.
+    """
+
+    def __init__(self, db_path=DB_PATH, profile=SQLITE_PROFILE):
+        if profile not in SQLITE_PROFILES:
+            raise ValueError(f"Unknown SQLite profile '{profile}', expected one of {list(SQLITE_PROFILES)}")
+        self.db_path = db_path
+        self.pragmas = SQLITE_PROFILES[profile]
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._readers = threading.local()
+        self._all_readers = []
+
+    def _connect(self, read_only=False):
+        conn = instrumentation.connect(self.db_path, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        if read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def writer(self):
+        """The shared write connection; use write() to hold the write lock while using it"""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            return self._writer
+
+    def reader(self):
+        """Read-only connection of the calling thread"""
+        conn = getattr(self._readers, 'conn', None)
+        if conn is None:
+            conn = self._readers.conn = self._connect(read_only=True)
+            self._all_readers.append(conn)
+        return conn
+
+    @contextmanager
+    def write(self):
+        """Hold the write lock; commits on success and rolls back on error"""
+        with self._write_lock:
+            conn = self.writer()
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    @contextmanager
+    def read(self):
+        """Read-only connection; ends the read transaction afterwards so the next read sees new commits"""
+        conn = self.reader()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+
+    def close(self):
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        for conn in self._all_readers:
+            conn.close()
+        self._all_readers = []
+        self._readers = threading.local()
+
+_manager = None
+
+def get_connection_manager(db_path=DB_PATH, profile=SQLITE_PROFILE) -> ConnectionManager:
+    """Process-wide connection manager, created on first use"""
+    global _manager
+    if _manager is None:
+        _manager = ConnectionManager(db_path, profile)
+    return _manager
+
+def close_connections():
+    """Close the connections of the process-wide manager"""
+    global _manager
+    if _manager is not None:
+        _manager.close()
+        _manager = None
+
+# Aggregates over profiles, kept up to date by the triggers below
+SUMMARY_TABLES = {
+    'bin_summary': 'bin',
+    'profile_summary': 'profile_id',
+}
+
+def _summary_trigger_sql(table, key, sign, row):
+    """Statement adding (sign=+1) or removing (sign=-1) one profiles row from a summary table"""
+    return f"""
+        INSERT INTO {table} ({key}, row_count, total_quantity, total_metres)
+        VALUES ({row}.{key}, {sign}, {sign} * {row}.quantity, {sign} * {row}.length * {row}.quantity / 1000.0)
+        ON CONFLICT({key}) DO UPDATE SET
+            row_count = row_count + excluded.row_count,
+            total_quantity = total_quantity + excluded.total_quantity,
+            total_metres = total_metres + excluded.total_metres;
+    """
+
+def setup_database(reset=False, db_path=DB_PATH):
     """Setup database tables with profile_id as TEXT"""
-    conn = get_connection()
+    conn = get_connection(db_path)
     cursor = conn.cursor()
     
     if reset:
         cursor.execute("""DROP TABLE IF EXISTS profiles""")
         cursor.execute("""DROP TABLE IF EXISTS bin_summary""")
+        cursor.execute("""DROP TABLE IF EXISTS profile_summary""")
+        cursor.execute("""DROP TABLE IF EXISTS processed_files""")
     
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS profiles (
@@ -26,20 +137,146 @@ def setup_database(reset=False):
     )
     """)
     
+    # Older databases have a bin_summary without counts and metres; it is derived data, so rebuild it
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(bin_summary)")]
+    if columns and 'total_metres' not in columns:
+        cursor.execute("""DROP TABLE bin_summary""")
+    
+    created = False
+    for table, key in SUMMARY_TABLES.items():
+        exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+        if not exists:
+            cursor.execute(f"""
+            CREATE TABLE {table} (
+                {key} TEXT PRIMARY KEY,
+                row_count INTEGER NOT NULL DEFAULT 0,
+                total_quantity INTEGER NOT NULL DEFAULT 0,
+                total_metres REAL NOT NULL DEFAULT 0
+            )
+            """)
+            created = True
+    
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_profiles_insert AFTER INSERT ON profiles
+    BEGIN
+        {_summary_trigger_sql('bin_summary', 'bin', 1, 'NEW')}
+        {_summary_trigger_sql('profile_summary', 'profile_id', 1, 'NEW')}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_profiles_delete AFTER DELETE ON profiles
+    BEGIN
+        {_summary_trigger_sql('bin_summary', 'bin', -1, 'OLD')}
+        {_summary_trigger_sql('profile_summary', 'profile_id', -1, 'OLD')}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_profiles_update AFTER UPDATE ON profiles
+    BEGIN
+        {_summary_trigger_sql('bin_summary', 'bin', -1, 'OLD')}
+        {_summary_trigger_sql('profile_summary', 'profile_id', -1, 'OLD')}
+        {_summary_trigger_sql('bin_summary', 'bin', 1, 'NEW')}
+        {_summary_trigger_sql('profile_summary', 'profile_id', 1, 'NEW')}
+    END
+    """)
+    
+    # Ledger of cutlists processed by the watch-folder service, keyed by file content
     cursor.execute("""
-    CREATE TABLE IF NOT EXISTS bin_summary (
-        bin TEXT PRIMARY KEY,
-        total_quantity INTEGER NOT NULL CHECK (total_quantity >= 0)
+    CREATE TABLE IF NOT EXISTS processed_files (
+        content_hash TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        status TEXT NOT NULL,
+        requirements INTEGER NOT NULL DEFAULT 0,
+        new_profiles INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        processed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
     )
     """)
     
     # Add index for better performance
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_profiles_name_length ON profiles(name, length)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_profiles_id ON profiles(profile_id)")
+    # One index per sort order of get_profiles_page(), so a page is read straight off the index;
+    # the primary key already covers sorting by profile_id
+    for column in PROFILE_COLUMNS:
+        if column != 'profile_id':
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_profiles_page_{column} "
+                           f"ON profiles({', '.join(_page_keys(column))})")
     
     conn.commit()
+    if created:
+        rebuild_summaries(conn)
     return conn
 
+def _computed_summaries(conn, key):
+    """Aggregates of one summary table computed from a scan of profiles"""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT {key}, COUNT(*), SUM(quantity), SUM(length * quantity) / 1000.0
+        FROM profiles
+        GROUP BY {key}
+    """)
+    return {row[0]: row[1:] for row in cursor.fetchall()}
+
+def rebuild_summaries(conn):
+    """Recompute bin_summary and profile_summary from profiles"""
+    cursor = conn.cursor()
+    for table, key in SUMMARY_TABLES.items():
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"""
+            INSERT INTO {table} ({key}, row_count, total_quantity, total_metres)
+            SELECT {key}, COUNT(*), SUM(quantity), SUM(length * quantity) / 1000.0
+            FROM profiles
+            GROUP BY {key}
+        """)
+    conn.commit()
+
+def check_summaries(conn, tolerance=1e-6):
+    """
+    Compare the summary tables with a scan of profiles.
+    Returns a list of (table, key, stored, computed) for every mismatch; empty when consistent.
+    """
+    mismatches = []
+    for table, key in SUMMARY_TABLES.items():
+        computed = _computed_summaries(conn, key)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {key}, row_count, total_quantity, total_metres FROM {table}")
+        stored = {row[0]: row[1:] for row in cursor.fetchall() if row[1] != 0}
+        for value in set(computed) | set(stored):
+            expected = computed.get(value, (0, 0, 0.0))
+            actual = stored.get(value, (0, 0, 0.0))
+            if (expected[0] != actual[0] or expected[1] != actual[1]
+                    or abs(expected[2] - actual[2]) > tolerance * max(1.0, abs(expected[2]))):
+                mismatches.append((table, value, actual, expected))
+    return mismatches
+
+def get_bin_summary(conn, bin_class=None):
+    """Row count, total quantity and total metres per bin, or for one bin"""
+    cursor = conn.cursor()
+    if bin_class is not None:
+        cursor.execute("""
+            SELECT bin, row_count, total_quantity, total_metres FROM bin_summary WHERE bin = ?
+        """, (bin_class,))
+        return cursor.fetchone()
+    cursor.execute("""
+        SELECT bin, row_count, total_quantity, total_metres FROM bin_summary WHERE row_count > 0 ORDER BY bin
+    """)
+    return cursor.fetchall()
+
+def get_profile_summary(conn, profile_id=None):
+    """Row count, total quantity and total metres per profile ID, or for one profile ID"""
+    cursor = conn.cursor()
+    if profile_id is not None:
+        cursor.execute("""
+            SELECT profile_id, row_count, total_quantity, total_metres FROM profile_summary WHERE profile_id = ?
+        """, (profile_id,))
+        return cursor.fetchone()
+    cursor.execute("""
+        SELECT profile_id, row_count, total_quantity, total_metres
+        FROM profile_summary WHERE row_count > 0 ORDER BY profile_id
+    """)
+    return cursor.fetchall()
+
 def add_profile(conn, name, length, quantity):
     """Add or update profile in database using profile ID"""
     if length <= 0 or quantity <= 0:
@@ -72,35 +309,102 @@ def add_profile(conn, name, length, quantity):
             SET quantity = ?
             WHERE profile_id = ? AND length = ?
         """, (new_qty, profile_id, length))
-        
-        # Update bin_summary
-        cursor.execute("""
-            UPDATE bin_summary
-            SET total_quantity = total_quantity + ?
-            WHERE bin = ?
-        """, (quantity, bin_class))
     else:
         # Insert new profile
         cursor.execute("""
             INSERT INTO profiles (profile_id, name, length, quantity, bin)
             VALUES (?, ?, ?, ?, ?)
         """, (profile_id, name, length, quantity, bin_class))
-        
-        cursor.execute("""
-            INSERT INTO bin_summary (bin, total_quantity)
-            VALUES (?, ?)
-            ON CONFLICT(bin) DO UPDATE SET total_quantity = total_quantity + excluded.total_quantity
-        """, (bin_class, quantity))
     
     conn.commit()
     return True
 
+def add_profiles_bulk(conn, profiles):
+    """
+    Add many (name, length, quantity) profiles in one transaction.
+    Duplicate (profile ID, length) rows are summed in memory first and written
+    with a single executemany upsert. Invalid rows are skipped like in add_profile.
+    Returns the number of distinct (profile ID, length) rows written.
+    """
+    totals = {}
+    unknown_names = set()
+    for name, length, quantity in profiles:
+        if length <= 0 or quantity <= 0:
+            continue
+        profile_id = get_profile_id_by_name(name)
+        if not profile_id:
+            unknown_names.add(name)
+            profile_id = name  # Fallback to using name as ID
+        key = (profile_id, float(length))
+        if key in totals:
+            totals[key][1] += int(quantity)
+        else:
+            totals[key] = [name, int(quantity)]
+    
+    for name in sorted(unknown_names):
+        print(f"Warning: Profile ID not found for '{name}'. Using name as ID.")
+    
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("""
+            INSERT INTO profiles (profile_id, name, length, quantity, bin)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(profile_id, length) DO UPDATE
+            SET quantity = quantity + excluded.quantity
+        """, [(profile_id, name, length, quantity, classify_bin(length))
+              for (profile_id, length), (name, quantity) in totals.items()])
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return len(totals)
+
 def get_all_profiles(conn):
     """Get all profiles from database"""
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM profiles ORDER BY profile_id, length")
     return cursor.fetchall()
 
+# Columns of a profiles row, in SELECT order; any of them can sort get_profiles_page()
+PROFILE_COLUMNS = ('profile_id', 'name', 'length', 'quantity', 'bin')
+
+def _page_keys(sort):
+    """Columns get_profiles_page() orders by: the sort column, then the primary key"""
+    return [sort] + [column for column in ('profile_id', 'length') if column != sort]
+
+def get_profiles_page(conn, limit=100, after=None, sort='profile_id', descending=False):
+    """
+    One page of profiles using keyset pagination.
+    Rows are ordered by sort, then profile_id and length so the order is total.
+    after is the last row of the previous page, or None for the first page;
+    only the rows of the requested page are read.
+    """
+    if sort not in PROFILE_COLUMNS:
+        raise ValueError(f"Unknown sort column '{sort}', expected one of {PROFILE_COLUMNS}")
+    keys = _page_keys(sort)
+    direction = "DESC" if descending else "ASC"
+    
+    where = ""
+    params = []
+    if after is not None:
+        where = f"WHERE ({', '.join(keys)}) {'<' if descending else '>'} ({', '.join('?' * len(keys))})"
+        params = [after[PROFILE_COLUMNS.index(column)] for column in keys]
+    
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT profile_id, name, length, quantity, bin FROM profiles
+        {where}
+        ORDER BY {', '.join(f'{column} {direction}' for column in keys)}
+        LIMIT ?
+    """, params + [limit])
+    return cursor.fetchall()
+
+def count_profiles(conn):
+    """Number of profile rows, from the trigger-maintained bin summary"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(SUM(row_count), 0) FROM bin_summary")
+    return cursor.fetchone()[0]
+
 def get_profiles_by_id(conn, profile_id):
     """Get profiles by profile ID"""
     cursor = conn.cursor()
@@ -129,4 +433,24 @@ def delete_profile(conn, profile_id, length):
     cursor = conn.cursor()
     cursor.execute("DELETE FROM profiles WHERE profile_id = ? AND length = ?", 
                  (profile_id, length))
-    conn.commit()
\ No newline at end of file
+    conn.commit()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the inventory summary tables")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    conn = setup_database(db_path=args.db)
+    if args.command == "rebuild":
+        rebuild_summaries(conn)
+        print("Summary tables rebuilt")
+    else:
+        problems = check_summaries(conn)
+        for table, key, stored, computed in problems:
+            print(f"{table} {key}: stored {stored}, expected {computed}")
+        print("Summary tables consistent" if not problems else f"{len(problems)} mismatches found")
+    conn.close()
+    raise SystemExit(1 if args.command == "check" and problems else 0)
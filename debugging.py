@@ -0,0 +1,52 @@
+"""
+Opt-in debugger hooks.
+
+No debugger is imported unless SCRAP_INVENTORY_DEBUGGER is set:
+
+    SCRAP_INVENTORY_DEBUGGER=pycharm   connect to a PyCharm debug server
+    SCRAP_INVENTORY_DEBUGGER=debugpy   listen for a VS Code / debugpy client
+
+SCRAP_INVENTORY_DEBUG_HOST and SCRAP_INVENTORY_DEBUG_PORT override the
+address (localhost:5678 by default).
+"""
+import os
+
+DEBUGGER = os.environ.get("SCRAP_INVENTORY_DEBUGGER", "").strip().lower()
+DEBUG_HOST = os.environ.get("SCRAP_INVENTORY_DEBUG_HOST", "localhost")
+DEBUG_PORT = int(os.environ.get("SCRAP_INVENTORY_DEBUG_PORT", "5678"))
+
+_attached = False
+
+
+def attach():
+    """Attach the debugger selected by SCRAP_INVENTORY_DEBUGGER, once per process"""
+    global _attached
+    if not DEBUGGER or _attached:
+        return
+    if DEBUGGER == "pycharm":
+        import pydevd_pycharm
+        pydevd_pycharm.settrace(DEBUG_HOST, port=DEBUG_PORT, suspend=False,
+                                stdoutToServer=True, stderrToServer=True)
+    elif DEBUGGER == "debugpy":
+        import debugpy
+        debugpy.listen((DEBUG_HOST, DEBUG_PORT))
+        print(f"debugpy listening on {DEBUG_HOST}:{DEBUG_PORT}")
+    else:
+        print(f"Warning: unknown SCRAP_INVENTORY_DEBUGGER '{DEBUGGER}', expected 'pycharm' or 'debugpy'")
+        return
+    _attached = True
+
+
+def settrace():
+    """
+    Break here when a debugger is enabled, e.g. inside a Dear PyGui callback,
+    which runs on a thread the debugger does not trace by default.
+    """
+    if DEBUGGER == "pycharm":
+        import pydevd_pycharm
+        pydevd_pycharm.settrace(DEBUG_HOST, port=DEBUG_PORT, suspend=True, trace_only_current_thread=True)
+    elif DEBUGGER == "debugpy":
+        attach()
+        import debugpy
+        debugpy.debug_this_thread()
+        debugpy.breakpoint()
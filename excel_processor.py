@@ -1,158 +1,383 @@
-import pandas as pd
 import os
-import math
-from typing import List, Dict, Any
+import re
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator, Optional
 
-import pydevd_pycharm
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
+from config import CUTLIST_CHUNK_ROWS, PRODUCT_SCHEMAS
+import instrumentation
 
-def parse_cutlist(excel_file_path: str) -> List[Dict[str, Any]]:
+# Bump when parsing output changes so cached cutlists are parsed again
+PARSER_VERSION = 3
+
+# ERP exports read with read_columnar() instead of pd.read_excel
+COLUMNAR_EXTENSIONS = ('.csv', '.parquet', '.pq')
+
+# Models that are never requirements even though they appear in the MODEL column
+EXCLUDED_MODELS = ['MODEL', '0', '01-LAD/9108-25', '01-LAD/9107-25', '01-LAD/9109-25']
+
+
+class ProductExtractor:
+    """
+    A product schema from config.PRODUCT_SCHEMAS compiled for column-wise
+    extraction: one regex for the model patterns and the component columns
+    in output order.
+    """
+    
+    def __init__(self, product: str, schema: Dict[str, Any]):
+        self.product = product
+        self.model_pattern = '|'.join(re.escape(pattern) for pattern in schema['model_patterns'])
+        components = schema['components']
+        self.qty_columns = [component['qty_column'] for component in components]
+        self.length_columns = [component['length_column'] for component in components]
+        self.profiles = [component['profile'] for component in components]
+        self.types = [component['type'] for component in components]
+    
+    def matches(self, models: "pd.Series") -> "np.ndarray":
+        """Boolean mask of the stripped MODEL values that belong to this product"""
+        return models.str.contains(self.model_pattern, regex=True).to_numpy(dtype=bool)
+    
+    def extract(self, rows: "pd.DataFrame", typed_cells: bool = True) -> List[tuple]:
+        """(label, component number, requirement) for every component of rows with a quantity and length"""
+        import numpy as np
+        
+        # One column per component: truncated quantities and half-up rounded lengths
+        quantities = np.column_stack([np.trunc(_numeric_column(rows, column, integer=typed_cells))
+                                      for column in self.qty_columns])
+        lengths = np.column_stack([np.floor(_numeric_column(rows, column, integer=False) + 0.5)
+                                   for column in self.length_columns])
+        
+        # Rows with infinite values cannot be converted and are reported and skipped as a whole
+        broken = np.isinf(quantities).any(axis=1) | np.isinf(lengths).any(axis=1)
+        for label in rows.index[broken]:
+            print(f"Error extracting {self.product} requirements for row {label + 1}: "
+                  f"cannot convert infinity to integer")
+        
+        keep = (quantities > 0) & (lengths > 0) & ~broken[:, None]
+        row_positions, components = np.nonzero(keep)
+        
+        labels = rows.index.to_numpy()
+        model_values = rows['MODEL'].tolist()
+        return [
+            (int(labels[pos]), comp, {
+                'row_index': int(labels[pos]) + 1,
+                'model': model_values[pos],
+                'requirement_type': self.types[comp],
+                'profile_name': self.profiles[comp],
+                'length': int(lengths[pos, comp]),
+                'quantity': int(quantities[pos, comp]),
+                'processed': False
+            })
+            for pos, comp in zip(row_positions.tolist(), components.tolist())
+        ]
+
+
+# Compiled once; a row is claimed by the first product whose patterns match
+PRODUCT_EXTRACTORS = [ProductExtractor(product, schema) for product, schema in PRODUCT_SCHEMAS.items()]
+
+@instrumentation.timed("parse_cutlist")
+def parse_cutlist(excel_file_path: str, sheet_name: str = 'Sheet1') -> List[Dict[str, Any]]:
     """
     Parse Excel cutlist and return requirements without processing allocation.
     Returns list of requirement dictionaries.
     """
+    import pandas as pd
+    
     if not os.path.exists(excel_file_path):
         raise FileNotFoundError(f"Excel file not found: {excel_file_path}")
     
     try:
-        df = pd.read_excel(excel_file_path, sheet_name='Sheet1')
+        if is_columnar(excel_file_path):
+            df = read_columnar(excel_file_path)
+        else:
+            with instrumentation.timer("parse.read_excel"):
+                df = pd.read_excel(excel_file_path, sheet_name=sheet_name)
         
         if df.empty:
             print("Warning: Excel file is empty")
             return []
         
-        # Clean column names
-        df.columns = [str(col).strip() for col in df.columns]
-        
-        requirements = []
-        processed_rows = 0
-        
-        for index, row in df.iterrows():
-            try:
-                model = str(row.get('MODEL', '')).strip()
-                
-                # Skip invalid rows
-                if (not model or model in ['MODEL', '0', '01-LAD/9108-25',
-                                           '01-LAD/9107-25', '01-LAD/9109-25'] or
-                        'KSLAD' not in model and 'KRLAD' not in model):
-                    continue
-                
-                # Process F-75 requirements
-                if 'KSLAD F-75' in model or 'KRLAD F-75' in model:
-                    row_requirements = extract_f75_requirements(row, index)
-                    if row_requirements:
-                        requirements.extend(row_requirements)
-                        processed_rows += 1
-            
-            except Exception as e:
-                print(f"Error processing row {index + 1}: {e}")
-                continue
+        requirements, processed_rows = requirements_from_frame(df, typed_cells=not is_csv(excel_file_path))
         
         print(f"Parsed {processed_rows} valid rows from cutlist")
+        instrumentation.count("parse.rows", processed_rows)
+        instrumentation.count("parse.requirements", len(requirements))
         return requirements
     
     except Exception as e:
         raise Exception(f"Error parsing cutlist: {e}")
 
-def extract_f75_requirements(row, index):
-    """Extract F-75 requirements from a row"""
-    def safe_int(value, default=0):
-        try:
-            return int(value) if pd.notna(value) and value != '' else default
-        except (ValueError, TypeError):
-            return default
+def is_csv(file_path: str) -> bool:
+    return file_path.lower().endswith('.csv')
+
+def is_columnar(file_path: str) -> bool:
+    """True for CSV and Parquet cutlist exports"""
+    return file_path.lower().endswith(COLUMNAR_EXTENSIONS)
+
+@instrumentation.timed("parse.read_columnar")
+def read_columnar(file_path: str) -> "pd.DataFrame":
+    """
+    Read a CSV or Parquet cutlist export into a DataFrame laid out like Sheet1.
+    Uses the pyarrow readers when pyarrow is installed and pandas otherwise.
+    """
+    import pandas as pd
     
-    def safe_float(value, default=0.0):
+    try:
+        import pyarrow
+    except ImportError:
+        pyarrow = None
+    
+    if is_csv(file_path):
+        if pyarrow is None:
+            return pd.read_csv(file_path)
+        from pyarrow import csv
+        return csv.read_csv(file_path).to_pandas()
+    
+    if pyarrow is None:
+        # pandas needs fastparquet for Parquet without pyarrow
+        return pd.read_parquet(file_path)
+    from pyarrow import parquet
+    return parquet.read_table(file_path).to_pandas()
+
+@instrumentation.timed("parse_workbook")
+def parse_workbook(excel_file_path: str, sheet_names: Optional[List[str]] = None,
+                   stream: bool = False) -> List[Dict[str, Any]]:
+    """
+    Parse every cutlist sheet of a workbook, or only the given sheet_names.
+    Sheets without a MODEL column are skipped. Each requirement is tagged
+    with the 'sheet' it came from. stream=True reads .xlsx sheets with
+    iter_cutlist() instead of loading them whole. CSV and Parquet files are
+    read as one table with an empty sheet name.
+    """
+    import pandas as pd
+    
+    if not os.path.exists(excel_file_path):
+        raise FileNotFoundError(f"Excel file not found: {excel_file_path}")
+    
+    requirements = []
+    if stream:
+        from openpyxl import load_workbook
         try:
-            return float(value) if pd.notna(value) and value != '' else default
-        except (ValueError, TypeError):
-            return default
+            workbook = load_workbook(excel_file_path, read_only=True)
+            available = workbook.sheetnames
+            workbook.close()
+        except Exception as e:
+            raise Exception(f"Error parsing cutlist: {e}")
+        for name in sheet_names or available:
+            for req in iter_cutlist(excel_file_path, sheet_name=name):
+                req['sheet'] = name
+                requirements.append(req)
+        return requirements
+    
+    try:
+        if is_columnar(excel_file_path):
+            # CSV and Parquet exports hold a single unnamed table
+            frames = {'': read_columnar(excel_file_path)}
+        else:
+            with instrumentation.timer("parse.read_excel"):
+                frames = pd.read_excel(excel_file_path, sheet_name=list(sheet_names) if sheet_names else None)
+    except Exception as e:
+        raise Exception(f"Error parsing cutlist: {e}")
     
-    def round_length_mm(length_value: float) -> int:
-        """Round length with .5 up and <.5 down to nearest mm."""
+    for name, df in frames.items():
         try:
-            if length_value is None:
-                return 0
-            # Ensure float
-            numeric = float(length_value)
-            # Half-up rule
-            return int(math.floor(numeric + 0.5))
-        except (ValueError, TypeError):
-            return 0
+            sheet_requirements, processed_rows = requirements_from_frame(
+                df, typed_cells=not is_csv(excel_file_path))
+        except Exception as e:
+            raise Exception(f"Error parsing cutlist sheet '{name}': {e}")
+        if processed_rows:
+            print(f"Parsed {processed_rows} valid rows from sheet '{name}'")
+        instrumentation.count("parse.rows", processed_rows)
+        instrumentation.count("parse.requirements", len(sheet_requirements))
+        for req in sheet_requirements:
+            req['sheet'] = name
+        requirements.extend(sheet_requirements)
+    return requirements
+
+def iter_cutlist(excel_file_path: str, chunk_rows: int = CUTLIST_CHUNK_ROWS,
+                 sheet_name: str = 'Sheet1') -> Iterator[Dict[str, Any]]:
+    """
+    Stream requirements from an .xlsx cutlist without loading the whole sheet.
+    The sheet is read with openpyxl in read-only mode and converted chunk_rows
+    rows at a time, so memory stays bounded by one chunk. Yields the same
+    requirement dictionaries, in the same order, as parse_cutlist.
+    """
+    from openpyxl import load_workbook
+
+    if not os.path.exists(excel_file_path):
+        raise FileNotFoundError(f"Excel file not found: {excel_file_path}")
     
     try:
-        # Get quantities and lengths
-        frame_qty = safe_int(row.get('FRAME_QTY'))
-        inner_vane_qty = safe_int(row.get('IV_QTY'))
-        pce_qty = safe_int(row.get('PCE_QTY'))
-        vcd_qty = safe_int(row.get('VCD_QTY'))
-        
-        frame_length = round_length_mm(safe_float(row.get('FRAME LENGTH')))
-        inner_vane_length = round_length_mm(safe_float(row.get('INNER VANE')))
-        pce_length = round_length_mm(safe_float(row.get('PCE')))
-        vcd_length = round_length_mm(safe_float(row.get('VCD')))
-        
-        requirements = []
-        
-        # Create requirement objects
-        req_types = [
-            (frame_qty, frame_length, "FRAME PROFILE FOR LAD F-75", "FRAME"),
-            (inner_vane_qty, inner_vane_length, "INNERVANE PROFILE LAD F-75", "INNER VANE"),
-            (pce_qty, pce_length, "P.C.E. PROFILE LAD F-75", "PCE"),
-            (vcd_qty, vcd_length, "VCD PROFILE LAD F-75", "VCD"),
-        ]
+        workbook = load_workbook(excel_file_path, read_only=True, data_only=True)
+    except Exception as e:
+        raise Exception(f"Error parsing cutlist: {e}")
+    
+    try:
+        if sheet_name not in workbook.sheetnames:
+            raise Exception(f"Error parsing cutlist: Worksheet named '{sheet_name}' not found")
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header = _header_columns(next(rows, ()))
+        if not header:
+            print("Warning: Excel file is empty")
+            return
         
-        for qty, length, profile_name, req_type in req_types:
-            if qty > 0 and length > 0:
-                requirements.append({
-                    'row_index': index + 1,
-                    'model': row.get('MODEL', 'N/A'),
-                    'requirement_type': req_type,
-                    'profile_name': profile_name,
-                    'length': length,
-                    'quantity': qty,
-                    'processed': False
-                })
+        processed_rows = 0
+        offset = 0
+        chunk = []
+        for row in rows:
+            chunk.append(row[:len(header)] + (None,) * (len(header) - len(row)))
+            if len(chunk) < chunk_rows:
+                continue
+            requirements, processed = _requirements_from_chunk(chunk, header, offset)
+            processed_rows += processed
+            offset += len(chunk)
+            chunk = []
+            yield from requirements
+        if chunk:
+            requirements, processed = _requirements_from_chunk(chunk, header, offset)
+            processed_rows += processed
+            yield from requirements
         
-        return requirements
+        print(f"Parsed {processed_rows} valid rows from cutlist")
+        instrumentation.count("parse.rows", processed_rows)
+    finally:
+        workbook.close()
+
+def _header_columns(values) -> List[str]:
+    """Column names for a header row, deduplicated like pd.read_excel does"""
+    columns = []
+    seen = {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value is None else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+def _requirements_from_chunk(chunk, header, offset):
+    """Run requirements_from_frame on sheet rows, labelled by their position in the sheet"""
+    import pandas as pd
     
-    except Exception as e:
-        print(f"Error extracting F-75 requirements for row {index + 1}: {e}")
-        return []
+    with instrumentation.timer("parse.chunk"):
+        df = pd.DataFrame.from_records(chunk, columns=header)
+        df.index = pd.RangeIndex(offset, offset + len(chunk))
+        requirements, processed = requirements_from_frame(df)
+    instrumentation.count("parse.requirements", len(requirements))
+    return requirements, processed
 
-def process_requirements(requirements: List[Dict], conn):
-    """Process a list of requirements using allocation algorithm"""
-    from allocation import best_fit_allocation, print_allocation_result
+def requirements_from_frame(df: "pd.DataFrame", typed_cells: bool = True):
+    """
+    Extract the requirements of every product in PRODUCT_SCHEMAS from a
+    cutlist sheet column by column, in sheet row order.
+    Pass typed_cells=False for CSV, where numbers in a column that also holds
+    text arrive as text; quantities like '2.5' are then read as numbers
+    instead of being rejected like text cells of a workbook.
+    Returns (requirements, number of rows that produced requirements).
+    """
+    # Clean column names
+    df.columns = [str(col).strip() for col in df.columns]
+    if 'MODEL' not in df.columns:
+        return [], 0
+    
+    # Skip invalid rows, then let each product claim its models
+    models = df['MODEL'].astype(str).str.strip()
+    unclaimed = ((models != '') & ~models.isin(EXCLUDED_MODELS)).to_numpy(copy=True)
+    found = []
+    for extractor in PRODUCT_EXTRACTORS:
+        selected = unclaimed & extractor.matches(models)
+        if selected.any():
+            unclaimed &= ~selected
+            found.extend(extractor.extract(df[selected], typed_cells))
+    
+    if len(PRODUCT_EXTRACTORS) > 1:
+        found.sort(key=lambda item: (item[0], item[1]))
+    return [req for _, _, req in found], len({label for label, _, _ in found})
 
-    sorted_requirements = sorted(requirements, key=lambda x: x['length'], reverse=True)
+def _numeric_column(df: "pd.DataFrame", column: str, integer: bool) -> "np.ndarray":
+    """
+    Coerce a column to float64 the way int()/float() would convert single cells.
+    Missing columns, blanks and unparseable cells become 0; infinities are kept.
+    Text cells must look like an integer when integer=True.
+    """
+    import numpy as np
+    import pandas as pd
+    
+    if column not in df.columns:
+        return np.zeros(len(df))
+    
+    series = df[column]
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        values = series.astype(float).to_numpy()
+    else:
+        series = series.astype(object)
+        try:
+            is_text = series.str.strip().notna()
+        except AttributeError:
+            # Object column without any text cells
+            is_text = pd.Series(False, index=series.index)
+        
+        text = series[is_text].astype(str).str.strip().str.replace(r'(?<=\d)_(?=\d)', '', regex=True)
+        if integer:
+            text = text.where(text.str.fullmatch(r'[+-]?\d+'))
+        parsed = pd.to_numeric(series.where(~is_text), errors='coerce').astype(float)
+        # Text cells are parsed separately so '3.0' is not a valid quantity, like int('3.0')
+        parsed[is_text] = pd.to_numeric(text, errors='coerce').astype(float)
+        values = parsed.to_numpy()
     
-    print("Processing Requirements:")
-    print("=" * 80)
+    return np.nan_to_num(values, nan=0.0, posinf=np.inf, neginf=-np.inf)
+
+def process_requirements(requirements: List[Dict], conn, verbose: bool = True, progress=None):
+    """
+    Process a list of requirements using allocation algorithm.
+    verbose=False skips the per-line report, for batch runs.
+    progress(done, total) is called as the allocation advances, see allocate_batch().
+    Returns the new profile totals and the (requirement, result) pairs.
+    """
+    from allocation import allocate_batch, print_allocation_result
+    from coalescing import coalesce_requirements, split_results
+    from config import COALESCE_REQUIREMENTS
+
+    if verbose:
+        print("Processing Requirements:")
+        print("=" * 80)
 
     total_new_profiles = 0
     per_profile_new = {}
 
-    #pydevd_pycharm.settrace(suspend=True, trace_only_current_thread=True)
-    for req in sorted_requirements:
-        if not req['processed']:
+    # All lines are allocated in one transaction; a failure leaves the inventory untouched
+    try:
+        pending = [req for req in requirements if not req['processed']]
+        # Identical lines are allocated once and the result is split back per row
+        batch = coalesce_requirements(pending) if COALESCE_REQUIREMENTS else pending
+        results = split_results(allocate_batch(batch, conn, progress=progress))
+    except Exception as e:
+        if verbose:
+            print(f"  {e}")
+            print("  Allocation rolled back, inventory unchanged")
+        raise
+
+    for req, result in results:
+        if verbose:
             print(f"\n{req['requirement_type']} Requirement: {req['length']}mm x {req['quantity']}pcs")
-            try:
-                result = best_fit_allocation(req['length'], req['quantity'], req['profile_name'], conn)
-                print_allocation_result(result)
-                req['processed'] = True
-
-                added = int(result.get('new_profiles_needed', 0) or 0)
-                if added > 0:
-                    total_new_profiles += added
-                    per_profile_new[req['profile_name']] = per_profile_new.get(req['profile_name'], 0) + added
-            except Exception as e:
-                print(f"  Error allocating {req['requirement_type']}: {e}")
-
-    print("\n" + "=" * 80)
-    print(f"Total new profiles added: {total_new_profiles}")
-    if per_profile_new:
-        print("\nNew profiles added per profile:")
-        for profile, count in per_profile_new.items():
-            print(f"  {profile}: {count}")
-    
-    return {"total_new_profiles": total_new_profiles, "per_profile_new": per_profile_new}
\ No newline at end of file
+            print_allocation_result(result)
+        req['processed'] = True
+
+        added = int(result.get('new_profiles_needed', 0) or 0)
+        if added > 0:
+            total_new_profiles += added
+            per_profile_new[req['profile_name']] = per_profile_new.get(req['profile_name'], 0) + added
+
+    if verbose:
+        print("\n" + "=" * 80)
+        print(f"Total new profiles added: {total_new_profiles}")
+        if per_profile_new:
+            print("\nNew profiles added per profile:")
+            for profile, count in per_profile_new.items():
+                print(f"  {profile}: {count}")
+    
+    return {"total_new_profiles": total_new_profiles, "per_profile_new": per_profile_new, "results": results}
@@ -0,0 +1,202 @@
+"""
+Opt-in timers and counters for cutlist runs.
+
+Instrumentation is off unless SCRAP_INVENTORY_PROFILE=1 is set or enable() is
+called. While it is off every hook is a cheap no-op. Set
+SCRAP_INVENTORY_PROFILE_FILE to also dump each finished run report as JSON.
+"""
+import functools
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+_enabled = os.environ.get("SCRAP_INVENTORY_PROFILE", "") not in ("", "0")
+_current = None
+
+
+class RunReport:
+    """Timings and counters collected during one cutlist run"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.time()
+        self.wall_start = time.perf_counter()
+        self.wall_time = None
+        # stage -> [calls, total seconds]
+        self.timers = {}
+        # counter -> value
+        self.counters = {}
+
+    def add_time(self, stage: str, seconds: float):
+        entry = self.timers.setdefault(stage, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def count(self, counter: str, amount: int = 1):
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def finish(self):
+        self.wall_time = time.perf_counter() - self.wall_start
+
+    def as_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'started': self.started,
+            'wall_time': self.wall_time,
+            'timers': {stage: {'calls': calls, 'total': total} for stage, (calls, total) in self.timers.items()},
+            'counters': dict(self.counters),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict(), indent=2)
+
+    def format_lines(self) -> List[str]:
+        """Human readable report, slowest stage first"""
+        lines = [f"Run '{self.name}'" + (f": {self.wall_time:.3f}s" if self.wall_time is not None else "")]
+        for stage, (calls, total) in sorted(self.timers.items(), key=lambda item: item[1][1], reverse=True):
+            lines.append(f"  {stage:<40} {total:>9.4f}s  ({calls} calls)")
+        for counter, value in sorted(self.counters.items()):
+            lines.append(f"  {counter:<40} {value:>9}")
+        return lines
+
+
+def enable(flag: bool = True):
+    """Turn instrumentation on or off for this process"""
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def start_run(name: str) -> Optional[RunReport]:
+    """Start collecting into a new report, replacing the current one"""
+    global _current
+    _current = RunReport(name) if _enabled else None
+    return _current
+
+
+def current_run() -> Optional[RunReport]:
+    return _current
+
+
+def finish_run() -> Optional[RunReport]:
+    """Close the current report, dump it if SCRAP_INVENTORY_PROFILE_FILE is set, and return it"""
+    global _current
+    report, _current = _current, None
+    if report is None:
+        return None
+    report.finish()
+    dump_path = os.environ.get("SCRAP_INVENTORY_PROFILE_FILE")
+    if dump_path:
+        with open(dump_path, "w") as f:
+            f.write(report.to_json() + "\n")
+    return report
+
+
+@contextmanager
+def timer(stage: str):
+    """Time a block into the current report"""
+    report = _current
+    if report is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        report.add_time(stage, time.perf_counter() - start)
+
+
+def timed(stage: str):
+    """Decorator form of timer()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            report = _current
+            if report is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                report.add_time(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def count(counter: str, amount: int = 1):
+    """Increase a counter in the current report"""
+    if _current is not None:
+        _current.count(counter, amount)
+
+
+def _statement_type(sql: str) -> str:
+    words = sql.split(None, 1)
+    return words[0].lower() if words else "empty"
+
+
+class _TracedCursor(sqlite3.Cursor):
+    """
+    Times each statement into the 'sql.<type>' stage, e.g. sql.select, and the
+    rows fetched afterwards into 'sql.<type>.fetch'. Statements run by
+    triggers are part of the statement that fired them.
+    """
+    _stage = "sql.empty"
+
+    def execute(self, sql, parameters=()):
+        self._stage = f"sql.{_statement_type(sql)}"
+        with timer(self._stage):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._stage = f"sql.{_statement_type(sql)}"
+        with timer(self._stage):
+            return super().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        self._stage = "sql.script"
+        with timer(self._stage):
+            return super().executescript(sql_script)
+
+    def fetchone(self):
+        with timer(self._stage + ".fetch"):
+            return super().fetchone()
+
+    def fetchmany(self, size=None):
+        with timer(self._stage + ".fetch"):
+            return super().fetchmany(self.arraysize if size is None else size)
+
+    def fetchall(self):
+        with timer(self._stage + ".fetch"):
+            return super().fetchall()
+
+
+class _TracedConnection(sqlite3.Connection):
+    """Connection whose cursors, including those of execute(), are _TracedCursors"""
+
+    def cursor(self, factory=_TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def connect(database, **kwargs) -> sqlite3.Connection:
+    """
+    sqlite3.connect() that times every SQL statement by type while
+    instrumentation is enabled. Rows read by iterating a cursor are not timed.
+    """
+    if _enabled:
+        kwargs.setdefault("factory", _TracedConnection)
+    return sqlite3.connect(database, **kwargs)
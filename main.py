@@ -1,7 +1,7 @@
 import os
-from database import setup_database, get_connection, get_all_profiles
-from ui import launch_ui
-import traceback, sys, dearpygui.dearpygui as dpg
+from database import setup_database, get_connection, get_all_profiles, close_connections
+import debugging
+import traceback, sys
 
 # ALWAYS print the full traceback
 
@@ -15,6 +15,7 @@ sys.excepthook = excepthook
 
 
 def main():
+    debugging.attach()
     try:
         # Setup database (don't reset on startup)
         conn = setup_database(reset=True)
@@ -37,12 +38,14 @@ def main():
         print("  - Reviewing requirements before processing")
         print("  - Switching between tabs while maintaining state")
         
-        # Launch GUI (no automatic cutlist processing)
+        # Launch GUI (no automatic cutlist processing); Dear PyGui is only imported here
+        from ui import launch_ui
         launch_ui()
     
     except Exception as e:
         print(f"Fatal error: {e}")
     finally:
+        close_connections()
         if 'conn' in locals():
             conn.close()
 
@@ -0,0 +1,136 @@
+"""
+On-disk cache of parsed cutlists.
+
+Entries are keyed by the SHA-256 of the workbook contents together with
+excel_processor.PARSER_VERSION, so an edited file or a parser change never
+hits a stale entry. Requirements are stored column-wise in compressed .npz
+files; the least recently used files are evicted once the cache directory
+grows past PARSE_CACHE_MAX_BYTES.
+"""
+import hashlib
+import os
+from typing import Dict, List, Optional
+
+from config import PARSE_CACHE_DIR, PARSE_CACHE_MAX_BYTES
+import instrumentation
+
+# Text columns are stored as unique values plus integer codes
+TEXT_FIELDS = ['model', 'requirement_type', 'profile_name']
+# Stored only when the parser tagged the requirements with it
+OPTIONAL_TEXT_FIELDS = ['sheet']
+INT_FIELDS = ['row_index', 'length', 'quantity']
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 of a file's contents, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(file_path: str, variant: str = '') -> str:
+    """
+    Content hash of a cutlist file combined with the parser version.
+    variant separates different parses of the same file, e.g. other sheets.
+    """
+    from excel_processor import PARSER_VERSION
+
+    key = f"{file_digest(file_path)}-v{PARSER_VERSION}"
+    if variant:
+        key += '-' + hashlib.sha256(variant.encode('utf-8')).hexdigest()[:16]
+    return key
+
+
+def _entry_path(key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, key + '.npz')
+
+
+@instrumentation.timed("parse_cache.load")
+def load(key: str, cache_dir: str = PARSE_CACHE_DIR) -> Optional[List[Dict]]:
+    """Cached requirements for a key, or None on a miss"""
+    import numpy as np
+
+    path = _entry_path(key, cache_dir)
+    if not os.path.exists(path):
+        instrumentation.count("parse_cache.miss")
+        return None
+
+    with np.load(path, allow_pickle=False) as data:
+        columns = {field: data[field].tolist() for field in INT_FIELDS}
+        for field in TEXT_FIELDS + [f for f in OPTIONAL_TEXT_FIELDS if f + '_codes' in data.files]:
+            values = data[field + '_values'].tolist()
+            columns[field] = [values[code] for code in data[field + '_codes'].tolist()]
+
+    # Mark the entry as recently used for eviction
+    os.utime(path)
+    instrumentation.count("parse_cache.hit")
+    requirements = [
+        {
+            'row_index': row_index,
+            'model': model,
+            'requirement_type': req_type,
+            'profile_name': profile_name,
+            'length': length,
+            'quantity': quantity,
+            'processed': False
+        }
+        for row_index, model, req_type, profile_name, length, quantity in zip(
+            columns['row_index'], columns['model'], columns['requirement_type'],
+            columns['profile_name'], columns['length'], columns['quantity'])
+    ]
+    for field in OPTIONAL_TEXT_FIELDS:
+        if field in columns:
+            for req, value in zip(requirements, columns[field]):
+                req[field] = value
+    return requirements
+
+
+@instrumentation.timed("parse_cache.store")
+def store(key: str, requirements: List[Dict], cache_dir: str = PARSE_CACHE_DIR,
+          max_bytes: int = PARSE_CACHE_MAX_BYTES):
+    """Save parsed requirements under a key and evict old entries"""
+    import numpy as np
+
+    arrays = {field: np.array([req[field] for req in requirements], dtype=np.int64) for field in INT_FIELDS}
+    text_fields = TEXT_FIELDS + [f for f in OPTIONAL_TEXT_FIELDS if requirements and f in requirements[0]]
+    for field in text_fields:
+        values, codes = np.unique(np.array([str(req[field]) for req in requirements], dtype=str),
+                                  return_inverse=True)
+        arrays[field + '_values'] = values
+        arrays[field + '_codes'] = codes.astype(np.int32)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(key, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir: str = PARSE_CACHE_DIR, max_bytes: int = PARSE_CACHE_MAX_BYTES) -> int:
+    """Delete least recently used entries until the cache fits in max_bytes. Returns the number deleted."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith('.npz'):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    deleted = 0
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(cache_dir, name))
+        total -= size
+        deleted += 1
+    return deleted
+
+
+def clear(cache_dir: str = PARSE_CACHE_DIR):
+    """Remove every cached entry"""
+    if os.path.isdir(cache_dir):
+        evict(cache_dir, 0)
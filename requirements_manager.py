@@ -1,23 +1,101 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Optional
 import os
 
+# Sheet read by load_file(); load_files() reads every cutlist sheet
+CUTLIST_SHEET = 'Sheet1'
+
+def parse_file(file_path: str, sheet_names: Optional[List[str]] = None, stream: Optional[bool] = None) -> List[Dict]:
+    """
+    Parse one cutlist workbook for the manager, reusing the parse cache when
+    the file content is unchanged. sheet_names=None parses every cutlist
+    sheet; stream=None streams .xlsx files of STREAMING_MIN_FILE_SIZE or more.
+    Module level so it can run in a worker process.
+    """
+    from config import PARSE_CACHE_DIR, STREAMING_MIN_FILE_SIZE
+    from excel_processor import parse_workbook
+    import parse_cache
+    
+    if stream is None:
+        stream = (file_path.lower().endswith(('.xlsx', '.xlsm')) and os.path.exists(file_path)
+                  and os.path.getsize(file_path) >= STREAMING_MIN_FILE_SIZE)
+    
+    key = None
+    if PARSE_CACHE_DIR and os.path.exists(file_path):
+        try:
+            key = parse_cache.cache_key(file_path, '' if sheet_names is None else '\n'.join(sheet_names))
+            cached = parse_cache.load(key)
+            if cached is not None:
+                print(f"Loaded {len(cached)} requirements for {os.path.basename(file_path)} from parse cache")
+                return cached
+        except Exception as e:
+            print(f"Warning: parse cache unavailable: {e}")
+            key = None
+    
+    requirements = parse_workbook(file_path, sheet_names, stream)
+    
+    if key is not None:
+        try:
+            parse_cache.store(key, requirements)
+        except Exception as e:
+            print(f"Warning: could not update parse cache: {e}")
+    return requirements
+
+
 class RequirementsManager:
     def __init__(self):
         self.current_file = None
         self.requirements = []
         self.current_file_path = None
+        # Every loaded file path, in load order
+        self.files = []
     
     def load_file(self, file_path: str) -> bool:
-        """Load and parse a cutlist file"""
+        """Load and parse Sheet1 of a cutlist file, streaming large .xlsx files"""
+        return self._load([file_path], [CUTLIST_SHEET])
+    
+    def load_file_streaming(self, file_path: str) -> bool:
+        """
+        Load an .xlsx cutlist with the streaming reader.
+        Only the requirement records are kept; the sheet itself is never
+        held in memory as a whole.
+        """
+        return self._load([file_path], [CUTLIST_SHEET], stream=True)
+    
+    def load_files(self, file_paths: List[str], sheet_names: Optional[List[str]] = None,
+                   workers: Optional[int] = None) -> bool:
+        """
+        Load several cutlist workbooks into one queue, parsing them in parallel.
+        Every sheet with a MODEL column is read unless sheet_names is given.
+        Requirements are tagged with their 'source_file' and 'sheet' and kept
+        in file order. Nothing is replaced if any file fails.
+        """
+        return self._load(list(file_paths), sheet_names, workers=workers)
+    
+    def _load(self, file_paths: List[str], sheet_names, stream=None, workers=None) -> bool:
         try:
-            from excel_processor import parse_cutlist
-            self.requirements = parse_cutlist(file_path)
-            self.current_file = os.path.basename(file_path)
-            self.current_file_path = file_path
-            return True
+            if len(file_paths) > 1 and workers != 1:
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=min(len(file_paths), workers or os.cpu_count() or 1)) as pool:
+                    parsed = list(pool.map(parse_file, file_paths, [sheet_names] * len(file_paths),
+                                           [stream] * len(file_paths)))
+            else:
+                parsed = [parse_file(path, sheet_names, stream) for path in file_paths]
         except Exception as e:
             print(f"Error loading file: {e}")
             return False
+        
+        self.requirements = []
+        for path, requirements in zip(file_paths, parsed):
+            for req in requirements:
+                req['source_file'] = os.path.basename(path)
+            self.requirements.extend(requirements)
+        self.files = file_paths
+        self.current_file_path = file_paths[0] if len(file_paths) == 1 else None
+        if len(file_paths) == 1:
+            self.current_file = os.path.basename(file_paths[0])
+        else:
+            self.current_file = f"{len(file_paths)} files"
+        return True
     
     def get_requirements(self) -> List[Dict]:
         """Get current requirements"""
@@ -32,6 +110,7 @@ class RequirementsManager:
         self.requirements = []
         self.current_file = None
         self.current_file_path = None
+        self.files = []
     
     def has_requirements(self) -> bool:
         """Check if there are any requirements"""
@@ -47,5 +126,6 @@ class RequirementsManager:
             'total_requirements': total_reqs,
             'processed_requirements': processed_reqs,
             'unprocessed_requirements': unprocessed_reqs,
-            'current_file': self.current_file
+            'current_file': self.current_file,
+            'files': [os.path.basename(path) for path in self.files]
         }
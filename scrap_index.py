@@ -0,0 +1,250 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import classify_bin
+
+
+class _Bucket:
+    """Rows of one profile name"""
+
+    __slots__ = ('entries', 'quantities', 'original', 'arrays')
+
+    def __init__(self):
+        # sorted list of (length, profile_id) for rows with quantity > 0
+        self.entries = []
+        # (profile_id, length) -> quantity
+        self.quantities = {}
+        # (profile_id, length) -> quantity when loaded, None if created in memory
+        self.original = {}
+        # [lengths, quantities, profile_ids] NumPy arrays aligned with entries,
+        # only built when candidates() is used and then kept in sync
+        self.arrays = None
+
+    def copy(self) -> "_Bucket":
+        bucket = _Bucket()
+        bucket.entries = list(self.entries)
+        bucket.quantities = dict(self.quantities)
+        bucket.original = dict(self.original)
+        if self.arrays is not None:
+            bucket.arrays = [array.copy() for array in self.arrays]
+        return bucket
+
+
+class ScrapIndex:
+    """
+    In-memory view of the profiles table used during an allocation run.
+    Rows are kept sorted by length per profile name so the smallest usable
+    scrap can be found with a binary search instead of a SQL query.
+    Changes are recorded and written back to the database by flush().
+    """
+
+    def __init__(self):
+        # name -> _Bucket
+        self._buckets = {}
+        # names whose bucket belongs to this index; others are shared with a snapshot and copied on write
+        self._owned = set()
+
+    @classmethod
+    def load(cls, conn, names: Optional[Iterable[str]] = None, min_length: float = 0) -> "ScrapIndex":
+        """
+        Load profiles from the database, optionally only for the given names.
+        Rows shorter than min_length are left out; leftovers added for them are
+        still merged correctly by flush().
+        """
+        index = cls()
+        cursor = conn.cursor()
+        if names is None:
+            cursor.execute("SELECT profile_id, name, length, quantity FROM profiles WHERE length >= ?", (min_length,))
+            rows = cursor.fetchall()
+        else:
+            rows = []
+            for name in set(names):
+                cursor.execute("""
+                    SELECT profile_id, name, length, quantity
+                    FROM profiles
+                    WHERE name = ? AND length >= ?
+                """, (name, min_length))
+                rows.extend(cursor.fetchall())
+
+        for profile_id, name, length, quantity in rows:
+            bucket = index._bucket(name)
+            key = (profile_id, length)
+            bucket.quantities[key] = quantity
+            bucket.original[key] = quantity
+            if quantity > 0:
+                bucket.entries.append((length, profile_id))
+
+        for bucket in index._buckets.values():
+            bucket.entries.sort()
+        return index
+
+    def snapshot(self) -> "ScrapIndex":
+        """
+        Copy-on-write copy of the index. Buckets are shared until either side
+        modifies them, so a snapshot costs O(number of profile names).
+        """
+        child = ScrapIndex()
+        child._buckets = dict(self._buckets)
+        self._owned = set()
+        return child
+
+    def subset(self, names: Iterable[str]) -> "ScrapIndex":
+        """Copy-on-write index holding only the given profile names"""
+        child = ScrapIndex()
+        for name in names:
+            if name in self._buckets:
+                child._buckets[name] = self._buckets[name]
+                self._owned.discard(name)
+        return child
+
+    def merge(self, other: "ScrapIndex"):
+        """Take over the rows of an index built with subset()"""
+        for name, bucket in other._buckets.items():
+            self._buckets[name] = bucket
+            self._owned.discard(name)
+            other._owned.discard(name)
+
+    def _bucket(self, name: str) -> _Bucket:
+        """Bucket for a name that this index may modify"""
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            bucket = self._buckets[name] = _Bucket()
+            self._owned.add(name)
+        elif name not in self._owned:
+            bucket = self._buckets[name] = bucket.copy()
+            self._owned.add(name)
+        return bucket
+
+    def names(self) -> List[str]:
+        """Profile names present in the index"""
+        return list(self._buckets)
+
+    def find(self, name: str, min_length: float) -> Optional[Tuple[str, float, int]]:
+        """Return (profile_id, length, quantity) of the shortest row with length >= min_length"""
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            return None
+        pos = bisect_left(bucket.entries, (min_length,))
+        if pos == len(bucket.entries):
+            return None
+        length, profile_id = bucket.entries[pos]
+        return profile_id, length, bucket.quantities[(profile_id, length)]
+
+    def candidates(self, name: str, min_length: float):
+        """
+        All rows with length >= min_length as NumPy arrays (lengths, quantities, profile_ids),
+        ordered by length. The arrays are views and must not be modified.
+        """
+        import numpy as np
+
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            return np.empty(0), np.empty(0, dtype=np.int64), np.empty(0, dtype=object)
+        if bucket.arrays is None:
+            bucket = self._bucket(name)
+            bucket.arrays = [
+                np.array([length for length, _ in bucket.entries], dtype=float),
+                np.array([bucket.quantities[(profile_id, length)] for length, profile_id in bucket.entries],
+                         dtype=np.int64),
+                np.array([profile_id for _, profile_id in bucket.entries], dtype=object),
+            ]
+        pos = bisect_left(bucket.entries, (min_length,))
+        return bucket.arrays[0][pos:], bucket.arrays[1][pos:], bucket.arrays[2][pos:]
+
+    def quantity(self, profile_id: str, name: str, length: float) -> int:
+        """Current quantity of a row, 0 if it does not exist"""
+        bucket = self._buckets.get(name)
+        return bucket.quantities.get((profile_id, length), 0) if bucket else 0
+
+    def consume(self, profile_id: str, name: str, length: float, quantity: int):
+        """Take quantity pieces from an existing row"""
+        bucket = self._bucket(name)
+        key = (profile_id, length)
+        available = bucket.quantities.get(key, 0)
+        if quantity > available:
+            raise ValueError(f"Cannot take {quantity} pcs of {profile_id} {length}mm, only {available} available")
+        bucket.quantities[key] = available - quantity
+        pos = bisect_left(bucket.entries, (length, profile_id))
+        if available == quantity:
+            del bucket.entries[pos]
+        self._sync_arrays(bucket, pos, profile_id, length, available - quantity)
+
+    def add(self, profile_id: str, name: str, length: float, quantity: int):
+        """Add quantity pieces of leftover scrap, merging with an existing row"""
+        if quantity <= 0:
+            return
+        bucket = self._bucket(name)
+        key = (profile_id, length)
+        if key not in bucket.original:
+            bucket.original[key] = None
+        old_quantity = bucket.quantities.get(key, 0)
+        pos = bisect_left(bucket.entries, (length, profile_id))
+        if old_quantity == 0:
+            bucket.entries.insert(pos, (length, profile_id))
+        bucket.quantities[key] = old_quantity + quantity
+        self._sync_arrays(bucket, pos, profile_id, length, old_quantity + quantity)
+
+    @staticmethod
+    def _sync_arrays(bucket, pos, profile_id, length, quantity):
+        """Apply a quantity change at position pos of the entries to the cached arrays"""
+        arrays = bucket.arrays
+        if arrays is None:
+            return
+        import numpy as np
+
+        in_arrays = pos < len(arrays[0]) and arrays[0][pos] == length and arrays[2][pos] == profile_id
+        if quantity == 0 and in_arrays:
+            bucket.arrays = [np.delete(array, pos) for array in arrays]
+        elif in_arrays:
+            arrays[1][pos] = quantity
+        else:
+            bucket.arrays = [np.insert(arrays[0], pos, length),
+                             np.insert(arrays[1], pos, quantity),
+                             np.insert(arrays[2], pos, profile_id)]
+
+    def rows(self, name: Optional[str] = None) -> List[Tuple[str, str, float, int, str]]:
+        """Current rows as (profile_id, name, length, quantity, bin), ordered like get_all_profiles"""
+        names = self._buckets if name is None else [name] if name in self._buckets else []
+        result = [
+            (profile_id, row_name, length, quantity, classify_bin(length))
+            for row_name in names
+            for (profile_id, length), quantity in self._buckets[row_name].quantities.items()
+            if quantity > 0
+        ]
+        result.sort(key=lambda r: (r[0], r[2]))
+        return result
+
+    def changes(self) -> Dict[str, list]:
+        """Rows that differ from the database, grouped by the statement needed to write them"""
+        deleted, updated, inserted = [], [], []
+        for name, bucket in self._buckets.items():
+            for key, original in bucket.original.items():
+                quantity = bucket.quantities[key]
+                if original is None:
+                    if quantity > 0:
+                        inserted.append((key[0], name, key[1], quantity, classify_bin(key[1])))
+                elif quantity != original:
+                    if quantity > 0:
+                        updated.append((quantity, key[0], key[1]))
+                    else:
+                        deleted.append(key)
+        return {'deleted': deleted, 'updated': updated, 'inserted': inserted}
+
+    def flush(self, conn):
+        """Write all changes since load() to the database. Does not commit."""
+        changes = self.changes()
+        cursor = conn.cursor()
+        cursor.executemany("DELETE FROM profiles WHERE profile_id = ? AND length = ?", changes['deleted'])
+        cursor.executemany("UPDATE profiles SET quantity = ? WHERE profile_id = ? AND length = ?",
+                           changes['updated'])
+        cursor.executemany("""
+            INSERT INTO profiles (profile_id, name, length, quantity, bin)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(profile_id, length) DO UPDATE
+            SET quantity = quantity + excluded.quantity
+        """, changes['inserted'])
+
+        # The database now matches memory
+        for name in list(self._buckets):
+            bucket = self._bucket(name)
+            bucket.original = dict(bucket.quantities)
@@ -0,0 +1,75 @@
+import os
+from typing import List, Tuple
+
+from config import get_profile_name_by_id
+from database import add_profiles_bulk
+
+# Accepted header spellings in stock-take sheets, compared after strip().upper()
+NAME_COLUMNS = ['NAME', 'PROFILE NAME', 'PROFILE', 'DESCRIPTION']
+ID_COLUMNS = ['PROFILE ID', 'PROFILE_ID', 'ID', 'ITEM CODE', 'CODE']
+LENGTH_COLUMNS = ['LENGTH', 'LENGTH (MM)', 'LENGTH MM']
+QUANTITY_COLUMNS = ['QUANTITY', 'QTY', 'PCS']
+
+
+def _find_column(columns, candidates):
+    for candidate in candidates:
+        if candidate in columns:
+            return candidate
+    return None
+
+
+def read_stock_take(file_path: str) -> List[Tuple[str, float, int]]:
+    """
+    Read a CSV or Excel stock-take sheet and return (name, length, quantity) rows.
+    The profile is taken from a name column, or looked up from a profile ID column.
+    Rows with a missing profile, length or quantity, or a quantity that is
+    not a whole number, are skipped.
+    """
+    import pandas as pd
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Stock-take file not found: {file_path}")
+
+    if file_path.lower().endswith('.csv'):
+        df = pd.read_csv(file_path)
+    else:
+        df = pd.read_excel(file_path)
+
+    df.columns = [str(col).strip().upper() for col in df.columns]
+
+    name_column = _find_column(df.columns, NAME_COLUMNS)
+    id_column = _find_column(df.columns, ID_COLUMNS)
+    length_column = _find_column(df.columns, LENGTH_COLUMNS)
+    quantity_column = _find_column(df.columns, QUANTITY_COLUMNS)
+    if length_column is None or quantity_column is None or (name_column is None and id_column is None):
+        raise ValueError("Stock-take sheet needs a profile name or ID column, a LENGTH column and a QUANTITY column")
+
+    if name_column is not None:
+        names = df[name_column].astype('string').str.strip()
+    else:
+        names = pd.Series(pd.NA, index=df.index, dtype='string')
+    if id_column is not None:
+        # Fill missing names from the profile ID
+        ids = df[id_column].astype('string').str.strip()
+        names = names.fillna(ids.map(get_profile_name_by_id, na_action='ignore'))
+
+    lengths = pd.to_numeric(df[length_column], errors='coerce')
+    quantities = pd.to_numeric(df[quantity_column], errors='coerce')
+
+    # Fractional quantities are rejected like non-numeric ones instead of being truncated
+    valid = names.notna() & (names != '') & lengths.gt(0) & quantities.gt(0) & quantities.mod(1).eq(0)
+    skipped = int((~valid).sum())
+    if skipped:
+        print(f"Skipped {skipped} invalid stock-take rows")
+
+    return list(zip(names[valid].tolist(),
+                    lengths[valid].astype(float).tolist(),
+                    quantities[valid].astype(int).tolist()))
+
+
+def import_stock_take(conn, file_path: str) -> dict:
+    """Import a stock-take sheet into the profiles table in one transaction"""
+    rows = read_stock_take(file_path)
+    written = add_profiles_bulk(conn, rows)
+    print(f"Imported {len(rows)} stock-take rows into {written} inventory rows")
+    return {'rows_read': len(rows), 'rows_written': written}
@@ -1,8 +1,8 @@
 import dearpygui.dearpygui as dpg
-import pydevd_pycharm
+import debugging
 
 def test_callback(sender, app_data, user_data):
-    pydevd_pycharm.settrace(suspend=True, trace_only_current_thread=True)
+    debugging.settrace()
     x = 42  # breakpoint here
     print("callback hit", x)
 
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from allocation import plan_allocation
+from benchmark import generate_cutlist_frame, generate_inventory
+from database import setup_database
+from excel_processor import requirements_from_frame
+from scrap_index import ScrapIndex
+
+
+@pytest.fixture
+def inventory():
+    conn = setup_database(db_path=":memory:")
+    generate_inventory(conn, 3000, seed=1)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("strategy", ["best_fit", "scored"])
+def test_pool_matches_serial(inventory, strategy):
+    requirements, _ = requirements_from_frame(generate_cutlist_frame(400, seed=2))
+    names = {req['profile_name'] for req in requirements}
+
+    serial_index = ScrapIndex.load(inventory, names)
+    serial = plan_allocation(requirements, serial_index, strategy, workers=1)
+    pool_index = ScrapIndex.load(inventory, names)
+    pooled = plan_allocation(requirements, pool_index, strategy, workers=2, min_parallel=0)
+
+    assert pooled == serial
+    assert pool_index.rows() == serial_index.rows()
+    assert pool_index.changes() == serial_index.changes()
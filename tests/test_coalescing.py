@@ -0,0 +1,94 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from allocation import plan_allocation
+from benchmark import generate_cutlist_frame, generate_inventory
+from coalescing import coalesce_requirements, split_results
+from database import setup_database
+from excel_processor import requirements_from_frame
+from scrap_index import ScrapIndex
+
+
+def requirement(row_index, quantity, length=1500, profile_name="FRAME PROFILE FOR LAD F-75"):
+    return {'row_index': row_index, 'model': 'KSLAD F-75 SINGLE DEFLECTION', 'requirement_type': 'FRAME',
+            'profile_name': profile_name, 'length': length, 'quantity': quantity, 'processed': False}
+
+
+def test_coalesce_groups_identical_lines():
+    rows = [requirement(0, 2), requirement(1, 1, length=900), requirement(2, 3),
+            requirement(3, 1, profile_name="VCD PROFILE LAD F-75")]
+    groups = coalesce_requirements(rows)
+    assert [(group['length'], group['quantity']) for group in groups] == [(1500, 5), (900, 1), (1500, 1)]
+    assert groups[0]['sources'] == [rows[0], rows[2]]
+    assert rows[0]['quantity'] == 2
+
+
+def test_split_hands_pieces_back_in_order():
+    rows = [requirement(0, 2), requirement(1, 3), requirement(2, 1)]
+    group = coalesce_requirements(rows)[0]
+    scrap = {'profile_id': 'K11I001009', 'scrap_length': 3100, 'scrap_qty_used': 2, 'pieces_per_scrap': 2,
+             'total_pieces': 4, 'total_waste': 60}
+    result = {'required_length': 1500, 'required_qty': 6, 'allocated_from_scrap': 2, 'allocated_from_new': 2,
+              'scrap_used': [scrap], 'scrap_created': [{'scrap_length': [1000, 0], 'scrap_qty': [1, 0]}],
+              'remaining_requirement': 2, 'new_profiles_needed': 1,
+              'cutting_patterns': [{'profile_id': 'K11I001009', 'pieces': [1500, 1500], 'bars': 1, 'leftover': 2960}]}
+
+    split = split_results([(group, result)])
+    assert [row for row, _ in split] == rows
+    first, second, third = [row_result for _, row_result in split]
+
+    assert first['allocated_from_scrap'] == 1 and first['remaining_requirement'] == 0
+    assert first['scrap_used'] == [dict(scrap, scrap_qty_used=1, total_pieces=2, total_waste=0)]
+    assert first['cutting_patterns'] == result['cutting_patterns']
+    assert first['scrap_created'] == result['scrap_created']
+
+    # The second row finishes the scrap entry, so it carries its waste, and starts on new bars
+    assert second['scrap_used'] == [dict(scrap, scrap_qty_used=1, total_pieces=2)]
+    assert second['remaining_requirement'] == 1 and second['allocated_from_new'] == 1
+    assert third['scrap_used'] == [] and third['allocated_from_new'] == 1
+    for row_result in (second, third):
+        assert 'cutting_patterns' not in row_result and row_result['scrap_created'] == []
+
+    for key in ('allocated_from_scrap', 'allocated_from_new', 'remaining_requirement', 'new_profiles_needed'):
+        assert sum(row_result[key] for _, row_result in split) == result[key]
+
+
+def test_round_trip_matches_uncoalesced_run():
+    conn = setup_database(db_path=":memory:")
+    generate_inventory(conn, 300, seed=1)
+    requirements, _ = requirements_from_frame(generate_cutlist_frame(200, seed=2))
+    # Round the lengths so many lines repeat
+    requirements = [dict(req, length=round(req['length'] / 50) * 50) for req in requirements]
+    names = {req['profile_name'] for req in requirements}
+    groups = coalesce_requirements(requirements)
+    assert len(groups) < len(requirements)
+
+    plain_index = ScrapIndex.load(conn, names)
+    plain = plan_allocation(requirements, plain_index, workers=1)
+    coalesced_index = ScrapIndex.load(conn, names)
+    aggregated = plan_allocation(groups, coalesced_index, workers=1)
+    split = split_results(aggregated)
+
+    assert sorted(id(row) for row, _ in split) == sorted(id(row) for row in requirements)
+    for row, row_result in split:
+        scrap_pieces = sum(scrap['total_pieces'] for scrap in row_result['scrap_used'])
+        assert scrap_pieces + row_result['remaining_requirement'] == row['quantity']
+        assert row_result['allocated_from_new'] == row_result['remaining_requirement']
+
+    def totals(results):
+        return {
+            'scrap_pieces': sum(scrap['total_pieces'] for _, result in results for scrap in result['scrap_used']),
+            'allocated_from_new': sum(result['allocated_from_new'] for _, result in results),
+            'remaining_requirement': sum(result['remaining_requirement'] for _, result in results),
+            'new_profiles_needed': sum(result['new_profiles_needed'] for _, result in results),
+        }
+
+    assert totals(split) == totals(plain)
+    assert coalesced_index.rows() == plain_index.rows()
+    # Whole scrap bars are counted once per group, never more often than line by line
+    assert (sum(result['allocated_from_scrap'] for _, result in split)
+            == sum(result['allocated_from_scrap'] for _, result in aggregated))
+    assert (sum(result['allocated_from_scrap'] for _, result in split)
+            <= sum(result['allocated_from_scrap'] for _, result in plain))
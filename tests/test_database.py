@@ -0,0 +1,59 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from allocation import allocate_batch
+from benchmark import generate_cutlist_frame, generate_inventory
+from config import classify_bin, get_profile_id_by_name
+from database import (add_profile, add_profiles_bulk, check_summaries, count_profiles, delete_profile,
+                      rebuild_summaries, setup_database, update_profile_quantity)
+from excel_processor import requirements_from_frame
+
+F75_FRAME = "FRAME PROFILE FOR LAD F-75"
+F100_VCD = "VCD PROFILE LAD F-100"
+
+
+def test_summaries_follow_mixed_writes():
+    conn = setup_database(db_path=":memory:")
+    generate_inventory(conn, 300, seed=5)
+    assert check_summaries(conn) == []
+
+    frame_id = get_profile_id_by_name(F75_FRAME)
+    add_profile(conn, F75_FRAME, 2750, 3)
+    add_profile(conn, F75_FRAME, 2750, 2)
+    add_profiles_bulk(conn, [(F100_VCD, 1800, 1), (F100_VCD, 1800, 4), (F75_FRAME, 4100, 2)])
+    assert check_summaries(conn) == []
+
+    update_profile_quantity(conn, frame_id, 2750, 1)
+    update_profile_quantity(conn, frame_id, 4100, 0)
+    delete_profile(conn, get_profile_id_by_name(F100_VCD), 1800)
+    assert check_summaries(conn) == []
+
+    # A length change moves the row to another bin
+    assert classify_bin(2750) != classify_bin(5900)
+    conn.execute("UPDATE profiles SET length = 5900, bin = ? WHERE profile_id = ? AND length = 2750",
+                 (classify_bin(5900), frame_id))
+    conn.commit()
+    assert check_summaries(conn) == []
+
+    # Allocation writes through ScrapIndex.flush: deletes, updates and leftover inserts
+    requirements, _ = requirements_from_frame(generate_cutlist_frame(60, seed=6))
+    allocate_batch(requirements, conn, workers=1)
+    assert check_summaries(conn) == []
+    assert count_profiles(conn) == conn.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+    conn.close()
+
+
+def test_check_reports_drift_until_rebuilt():
+    conn = setup_database(db_path=":memory:")
+    generate_inventory(conn, 50, seed=7)
+    conn.execute("UPDATE bin_summary SET total_quantity = total_quantity + 1")
+    conn.execute("DELETE FROM profile_summary")
+    conn.commit()
+
+    mismatches = check_summaries(conn)
+    assert {table for table, _, _, _ in mismatches} == {"bin_summary", "profile_summary"}
+    rebuild_summaries(conn)
+    assert check_summaries(conn) == []
+    conn.close()
@@ -0,0 +1,65 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import excel_processor
+import parse_cache
+
+REQUIREMENTS = [
+    {'row_index': 0, 'model': 'KSLAD F-75 SINGLE DEFLECTION', 'requirement_type': 'FRAME',
+     'profile_name': 'FRAME PROFILE FOR LAD F-75', 'length': 1200, 'quantity': 2, 'processed': False},
+    {'row_index': 3, 'model': 'KSLAD F-100 SINGLE DEFLECTION', 'requirement_type': 'VCD',
+     'profile_name': 'VCD PROFILE LAD F-100', 'length': 845, 'quantity': 4, 'processed': False},
+]
+
+
+def write(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_key_changes_with_content_version_and_variant(tmp_path, monkeypatch):
+    cutlist = write(tmp_path / "cutlist.xlsx", b"first version")
+    key = parse_cache.cache_key(cutlist)
+    assert parse_cache.cache_key(cutlist) == key
+
+    # Same bytes under another name share the entry
+    assert parse_cache.cache_key(write(tmp_path / "copy.xlsx", b"first version")) == key
+    assert parse_cache.cache_key(cutlist, "Sheet1,Sheet2") not in (key, parse_cache.cache_key(cutlist, "Sheet1"))
+
+    monkeypatch.setattr(excel_processor, "PARSER_VERSION", excel_processor.PARSER_VERSION + 1)
+    assert parse_cache.cache_key(cutlist) != key
+    monkeypatch.undo()
+
+    write(tmp_path / "cutlist.xlsx", b"edited version")
+    assert parse_cache.cache_key(cutlist) != key
+
+
+def test_store_and_load_round_trip(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    assert parse_cache.load("missing", cache_dir) is None
+
+    parse_cache.store("plain", REQUIREMENTS, cache_dir)
+    assert parse_cache.load("plain", cache_dir) == REQUIREMENTS
+
+    tagged = [dict(req, sheet=sheet) for req, sheet in zip(REQUIREMENTS, ["Sheet1", "Sheet2"])]
+    parse_cache.store("tagged", tagged, cache_dir)
+    assert parse_cache.load("tagged", cache_dir) == tagged
+
+
+def test_evicts_least_recently_used_by_size(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    for age, key in enumerate(["newest", "middle", "oldest"]):
+        parse_cache.store(key, REQUIREMENTS, cache_dir)
+        path = os.path.join(cache_dir, key + ".npz")
+        os.utime(path, (1000000 - age * 100, 1000000 - age * 100))
+    entry_size = os.path.getsize(os.path.join(cache_dir, "newest.npz"))
+
+    # Loading marks an entry as used, so "oldest" now outlives "middle"
+    assert parse_cache.load("oldest", cache_dir) is not None
+    assert parse_cache.evict(cache_dir, max_bytes=2 * entry_size + entry_size // 2) == 1
+    assert sorted(os.listdir(cache_dir)) == ["newest.npz", "oldest.npz"]
+
+    parse_cache.clear(cache_dir)
+    assert os.listdir(cache_dir) == []
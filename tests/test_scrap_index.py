@@ -0,0 +1,152 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from allocation import best_fit_allocation
+from benchmark import generate_cutlist_frame, generate_inventory
+from config import MIN_SCRAP_LENGTH, classify_bin, get_cutting_allowance, get_profile_id_by_name
+from database import get_all_profiles, setup_database
+from excel_processor import requirements_from_frame
+from scrap_index import ScrapIndex
+
+F75_FRAME = "FRAME PROFILE FOR LAD F-75"
+F75_VCD = "VCD PROFILE LAD F-75"
+
+
+def sql_best_fit(conn, required_length, required_qty, profile_name):
+    """The allocation before ScrapIndex: one query per scrap taken, scrap only"""
+    req_length_ind = required_length + get_cutting_allowance(profile_name)
+    result = {'allocated_from_scrap': 0, 'scrap_used': []}
+    remaining = required_qty
+    cursor = conn.cursor()
+    while remaining > 0:
+        cursor.execute("""
+            SELECT profile_id, length, quantity FROM profiles
+            WHERE name = ? AND length >= ? ORDER BY length ASC LIMIT 1
+        """, (profile_name, req_length_ind))
+        row = cursor.fetchone()
+        if not row:
+            break
+        profile_id, scrap_length, scrap_qty = row
+        pieces_per_scrap = int(scrap_length // req_length_ind)
+        scrap_needed = min((remaining + pieces_per_scrap - 1) // pieces_per_scrap, scrap_qty)
+        pieces_obtained = min(scrap_needed * pieces_per_scrap, remaining)
+        full_scraps = pieces_obtained // pieces_per_scrap
+        partial_scraps = scrap_needed - full_scraps
+        partial_pieces = pieces_obtained % pieces_per_scrap
+        leftover_full = scrap_length - pieces_per_scrap * req_length_ind if full_scraps else 0
+        leftover_partial = scrap_length - partial_pieces * req_length_ind if partial_scraps else 0
+        result['allocated_from_scrap'] += scrap_needed
+        remaining -= pieces_obtained
+        result['scrap_used'].append((profile_id, scrap_length, scrap_needed, pieces_obtained))
+
+        if scrap_qty > scrap_needed:
+            cursor.execute("UPDATE profiles SET quantity = ? WHERE profile_id = ? AND length = ?",
+                           (scrap_qty - scrap_needed, profile_id, scrap_length))
+        else:
+            cursor.execute("DELETE FROM profiles WHERE profile_id = ? AND length = ?", (profile_id, scrap_length))
+        for leftover, count in ((leftover_full, full_scraps), (leftover_partial, partial_scraps)):
+            if leftover >= MIN_SCRAP_LENGTH:
+                cursor.execute("""
+                    INSERT INTO profiles (profile_id, name, length, quantity, bin) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(profile_id, length) DO UPDATE SET quantity = quantity + excluded.quantity
+                """, (profile_id, profile_name, leftover, count, classify_bin(leftover)))
+    result['remaining_requirement'] = remaining
+    return result
+
+
+def indexed_best_fit(index, required_length, required_qty, profile_name):
+    result = best_fit_allocation(required_length, required_qty, profile_name, None, index=index,
+                                 allocate_new=False, strategy="best_fit")
+    return {
+        'allocated_from_scrap': result['allocated_from_scrap'],
+        'scrap_used': [(scrap['profile_id'], scrap['scrap_length'], scrap['scrap_qty_used'], scrap['total_pieces'])
+                       for scrap in result['scrap_used']],
+        'remaining_requirement': result['remaining_requirement'],
+    }
+
+
+def fixed_inventory(rows):
+    conn = setup_database(db_path=":memory:")
+    conn.executemany("INSERT INTO profiles (profile_id, name, length, quantity, bin) VALUES (?, ?, ?, ?, ?)",
+                     [(get_profile_id_by_name(name), name, length, quantity, classify_bin(length))
+                      for name, length, quantity in rows])
+    conn.commit()
+    return conn
+
+
+SMALL_INVENTORY = [
+    (F75_FRAME, 1200, 1), (F75_FRAME, 2500, 2), (F75_FRAME, 3100, 1), (F75_FRAME, 5800, 3),
+    (F75_VCD, 1500, 4), (F75_VCD, 2950.5, 1), (F75_VCD, 6000, 2),
+]
+SMALL_REQUIREMENTS = [(F75_FRAME, 1400, 3), (F75_FRAME, 900, 5), (F75_VCD, 1450, 6), (F75_FRAME, 2400, 4),
+                      (F75_VCD, 700, 2), (F75_FRAME, 5000, 1)]
+
+
+def run_both(inventory_rows, requirements):
+    sql_conn = fixed_inventory(inventory_rows)
+    index_conn = fixed_inventory(inventory_rows)
+    index = ScrapIndex.load(index_conn)
+    for profile_name, length, quantity in requirements:
+        assert indexed_best_fit(index, length, quantity, profile_name) == \
+            sql_best_fit(sql_conn, length, quantity, profile_name)
+    assert index.rows() == get_all_profiles(sql_conn)
+    index.flush(index_conn)
+    assert get_all_profiles(index_conn) == get_all_profiles(sql_conn)
+
+
+def test_matches_sql_path_on_small_inventory():
+    run_both(SMALL_INVENTORY, SMALL_REQUIREMENTS)
+
+
+def test_matches_sql_path_on_generated_inventory():
+    conn = setup_database(db_path=":memory:")
+    generate_inventory(conn, 400, seed=3)
+    inventory_rows = [(name, length, quantity) for _, name, length, quantity, _ in get_all_profiles(conn)]
+    requirements, _ = requirements_from_frame(generate_cutlist_frame(80, seed=4))
+    run_both(inventory_rows, [(req['profile_name'], req['length'], req['quantity']) for req in requirements])
+
+
+def test_find_consume_add():
+    index = ScrapIndex.load(fixed_inventory(SMALL_INVENTORY))
+    frame_id = get_profile_id_by_name(F75_FRAME)
+    assert index.find(F75_FRAME, 2500) == (frame_id, 2500, 2)
+    assert index.find(F75_FRAME, 6000) is None
+    assert index.find("UNKNOWN", 0) is None
+
+    index.consume(frame_id, F75_FRAME, 2500, 2)
+    assert index.find(F75_FRAME, 2500) == (frame_id, 3100, 1)
+    with pytest.raises(ValueError):
+        index.consume(frame_id, F75_FRAME, 3100, 2)
+
+    index.add(frame_id, F75_FRAME, 2600, 3)
+    index.add(frame_id, F75_FRAME, 1200, 1)
+    assert index.find(F75_FRAME, 2500) == (frame_id, 2600, 3)
+    assert index.quantity(frame_id, F75_FRAME, 1200) == 2
+    assert index.changes() == {
+        'deleted': [(frame_id, 2500)],
+        'updated': [(2, frame_id, 1200)],
+        'inserted': [(frame_id, F75_FRAME, 2600, 3, classify_bin(2600))],
+    }
+
+
+def test_snapshot_and_subset_leave_the_parent_alone():
+    index = ScrapIndex.load(fixed_inventory(SMALL_INVENTORY))
+    before = index.rows()
+    frame_id = get_profile_id_by_name(F75_FRAME)
+
+    snapshot = index.snapshot()
+    snapshot.consume(frame_id, F75_FRAME, 5800, 3)
+    assert index.rows() == before
+    assert snapshot.find(F75_FRAME, 5000) is None
+
+    subset = index.subset([F75_FRAME])
+    assert subset.names() == [F75_FRAME]
+    subset.consume(frame_id, F75_FRAME, 1200, 1)
+    assert index.rows() == before
+    index.merge(subset)
+    assert index.quantity(frame_id, F75_FRAME, 1200) == 0
+    assert index.quantity(get_profile_id_by_name(F75_VCD), F75_VCD, 1500) == 4
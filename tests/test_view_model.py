@@ -0,0 +1,87 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import classify_bin
+from database import add_profile, get_profiles_page, setup_database
+from view_model import KeyedRows, profile_records
+
+
+class FakeScreen:
+    """Rows on screen as lists of cell values, with a log of widget calls"""
+
+    def __init__(self):
+        self.rows = []
+        self.calls = []
+
+    def add_row(self, values):
+        row = list(values)
+        self.rows.append(row)
+        self.calls.append('add')
+        return row, [(row, i) for i in range(len(values))]
+
+    def set_cell(self, cell, value):
+        row, i = cell
+        row[i] = value
+        self.calls.append('set')
+
+    def delete_row(self, row):
+        self.rows.remove(row)
+        self.calls.append('delete')
+
+    def move_row(self, row):
+        self.rows.remove(row)
+        self.rows.append(row)
+        self.calls.append('move')
+
+    def keyed_rows(self):
+        return KeyedRows(self.add_row, self.set_cell, self.delete_row, self.move_row)
+
+
+def test_sync_two_lengths_of_the_same_profile(tmp_path):
+    conn = setup_database(db_path=str(tmp_path / "inventory.db"))
+    add_profile(conn, "FRAME PROFILE FOR LAD F-75", 3000, 2)
+    add_profile(conn, "FRAME PROFILE FOR LAD F-75", 4500, 1)
+    conn.commit()
+
+    screen = FakeScreen()
+    view = screen.keyed_rows()
+    view.sync(profile_records(get_profiles_page(conn)))
+    assert screen.rows == [["K11I001009", "FRAME PROFILE FOR LAD F-75", "3000", "2", classify_bin(3000)],
+                           ["K11I001009", "FRAME PROFILE FOR LAD F-75", "4500", "1", classify_bin(4500)]]
+
+    # Changing the stock of one length updates only its quantity cell
+    add_profile(conn, "FRAME PROFILE FOR LAD F-75", 4500, 3)
+    conn.commit()
+    screen.calls.clear()
+    view.sync(profile_records(get_profiles_page(conn)))
+    assert screen.calls == ['set']
+    assert screen.rows[1][3] == "4"
+    conn.close()
+
+
+def test_sync_applies_only_changes():
+    screen = FakeScreen()
+    view = screen.keyed_rows()
+    records = [(i, (f"line {i}", "Pending")) for i in range(1000)]
+    assert view.sync(records)['added'] == 1000
+
+    records[5] = (5, ("line 5", "Processed"))
+    assert view.sync(records) == {'added': 0, 'deleted': 0, 'cells': 1, 'moved': 0}
+    assert screen.rows[5] == ["line 5", "Processed"]
+
+    # New records reuse the rows of records that are gone
+    changes = view.sync([(i, (f"line {i}", "Pending")) for i in range(1000, 1200)])
+    assert changes['added'] == 0 and changes['deleted'] == 800
+    assert screen.rows == [[f"line {i}", "Pending"] for i in range(1000, 1200)]
+
+
+def test_sync_follows_record_order():
+    screen = FakeScreen()
+    view = screen.keyed_rows()
+    view.sync([(key, (key,)) for key in "abc"])
+    view.sync([(key, (key,)) for key in "cab"])
+    assert screen.rows == [["c"], ["a"], ["b"]]
+    view.clear()
+    assert screen.rows == [] and len(view) == 0
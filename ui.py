@@ -1,18 +1,69 @@
 import dearpygui.dearpygui as dpg
-import pandas as pd
 import os
 import shutil 
 import math
-import debugpy
-import pydevd_pycharm
+import queue
+import threading
+import time
 
-from config import PROFILE_NAMES, get_product_names, get_product_components
-from database import add_profile, get_connection, get_all_profiles
+from config import CUTLIST_EXTENSIONS, PROFILE_NAMES, get_product_names, get_product_components
+from database import (add_profile, count_profiles, get_all_profiles, get_bin_summary, get_connection_manager,
+                      get_profiles_page)
 from requirements_manager import RequirementsManager
+from allocation import AllocationCancelled
 from excel_processor import process_requirements
+from stock_import import import_stock_take
+from view_model import KeyedRows, profile_records
+import instrumentation
+
+# View Database table: rows fetched and drawn per page, and (header, column) pairs
+DB_PAGE_SIZE = 200
+DB_COLUMNS = [("Profile ID", "profile_id"), ("Name", "name"), ("Length (mm)", "length"),
+              ("Qty", "quantity"), ("Bin", "bin")]
 
 # Global state
 requirements_manager = RequirementsManager()
+# Keyset paging of the View Database table; page_starts holds the row before each visited page
+db_view_state = {'sort': 'profile_id', 'descending': False, 'page_starts': [None], 'next': None}
+# Allocation running in the background: worker thread, its message queue and cancel flag
+allocation_job = {'thread': None, 'queue': None, 'cancel': None, 'started': None}
+# Buttons that write to the inventory, disabled while an allocation run holds the write lock
+INVENTORY_WRITE_BUTTONS = ("add_profile_button", "import_stock_button")
+
+
+def text_rows(parent, color=None):
+    """KeyedRows that draws each record as a line of text cells under parent"""
+    style = {'color': color} if color else {}
+
+    def add_row(values):
+        with dpg.group(parent=parent, horizontal=True) as row:
+            cells = [dpg.add_text(value, **style) for value in values]
+        return row, cells
+
+    return KeyedRows(add_row, dpg.set_value, dpg.delete_item, lambda row: dpg.move_item(row, parent=parent))
+
+
+def add_db_row(values):
+    with dpg.table_row(parent="db_table") as row:
+        cells = [dpg.add_text(value) for value in values]
+    return row, cells
+
+
+def add_component_row(values):
+    component, unit = values
+    with dpg.group(parent="product_components_group", horizontal=True) as row:
+        cells = [dpg.add_text(component), dpg.add_text(unit, color=[150, 150, 150]),
+                 dpg.add_input_float(label="Total weight (kg)", width=150, min_value=0.0, min_clamped=True,
+                                     default_value=0.0)]
+    return row, cells
+
+
+# Widgets of the list views, refreshed in place by diffing against the last refresh
+requirement_rows = text_rows("requirements_group")
+bin_rows = text_rows("db_view_group", color=[0, 255, 255])
+db_rows = KeyedRows(add_db_row, dpg.set_value, dpg.delete_item, lambda row: dpg.move_item(row, parent="db_table"))
+component_rows = KeyedRows(add_component_row, dpg.set_value, dpg.delete_item,
+                           lambda row: dpg.move_item(row, parent="product_components_group"))
 
 def launch_ui():
     """Launch the Dear PyGui interface with resizable and scrollable UI"""
@@ -24,6 +75,13 @@ def launch_ui():
     # Create file dialog once during initialization
     with dpg.file_dialog(directory_selector=False, show=False, callback=file_selection_callback, 
                         tag="file_dialog", width=700, height=400):
+        for extension in CUTLIST_EXTENSIONS:
+            dpg.add_file_extension(extension, color=(0, 255, 0, 255))
+        dpg.add_file_extension(".*", color=(255, 255, 255, 255))
+    
+    with dpg.file_dialog(directory_selector=False, show=False, callback=stock_take_selection_callback,
+                        tag="stock_take_dialog", width=700, height=400):
+        dpg.add_file_extension(".csv", color=(0, 255, 0, 255))
         dpg.add_file_extension(".xlsx", color=(0, 255, 0, 255))
         dpg.add_file_extension(".xls", color=(0, 255, 0, 255))
         dpg.add_file_extension(".*", color=(255, 255, 255, 255))
@@ -40,8 +98,8 @@ def launch_ui():
                 
                 # File upload area
                 with dpg.group(horizontal=True):
-                    dpg.add_button(label="Select Excel File", callback=file_dialog_callback)
-                    dpg.add_text("Click to browse for Excel files", color=[100, 100, 100])
+                    dpg.add_button(label="Select Cutlist File", callback=file_dialog_callback)
+                    dpg.add_text("Click to browse for Excel, CSV or Parquet files", color=[100, 100, 100])
                 
                 # File info display
                 dpg.add_text("No file selected", tag="file_info", color=[255, 255, 0])
@@ -50,6 +108,7 @@ def launch_ui():
                 
                 # Requirements display - simplified
                 dpg.add_text("Requirements:", color=[0, 255, 255])
+                dpg.add_text("", tag="requirements_total", color=[255, 255, 0])
                 dpg.add_group(tag="requirements_group", horizontal=False)
                 
                 dpg.add_separator()
@@ -58,8 +117,11 @@ def launch_ui():
                 with dpg.group(horizontal=True):
                     dpg.add_button(label="Process Requirements", callback=process_requirements_callback, 
                                  enabled=False, tag="process_button")
+                    dpg.add_button(label="Cancel", callback=cancel_processing_callback,
+                                 enabled=False, tag="cancel_button")
                     dpg.add_button(label="Clear File", callback=clear_file_callback)
                 
+                dpg.add_progress_bar(tag="progress_bar", default_value=0.0, width=-1, show=False)
                 dpg.add_text("", tag="processing_status", color=[0, 255, 0])
                 
                 # Results area - simplified
@@ -76,7 +138,12 @@ def launch_ui():
                 dpg.add_combo(PROFILE_NAMES, label="Profile Name", tag="profile_name_dropdown")
                 dpg.add_input_float(label="Length (mm)", tag="length_input", default_value=0.0)
                 dpg.add_input_int(label="Quantity", tag="quantity_input", default_value=0)
-                dpg.add_button(label="Add to Database", callback=submit_profile_callback)
+                dpg.add_button(label="Add to Database", callback=submit_profile_callback, tag="add_profile_button")
+                
+                dpg.add_separator()
+                dpg.add_text("Import a stock-take sheet (CSV or Excel)", color=[0, 255, 255])
+                dpg.add_button(label="Import Stock-Take", callback=lambda: dpg.show_item("stock_take_dialog"),
+                               tag="import_stock_button")
             
             # --- Tab 3: View Database ---
             with dpg.tab(label="View Database"):
@@ -90,8 +157,20 @@ def launch_ui():
                 
                 dpg.add_separator()
                 
-                # Database view - simplified
+                # Bin totals, then one page of the inventory at a time
+                dpg.add_text("", tag="db_status_text")
                 dpg.add_group(tag="db_view_group", horizontal=False)
+                dpg.add_separator()
+                with dpg.group(horizontal=True):
+                    dpg.add_button(label="< Prev", tag="db_prev_button", callback=db_prev_page_callback, enabled=False)
+                    dpg.add_button(label="Next >", tag="db_next_button", callback=db_next_page_callback, enabled=False)
+                    dpg.add_text("", tag="db_page_info", color=[100, 100, 100])
+                
+                with dpg.table(tag="db_table", header_row=True, sortable=True, callback=db_sort_callback,
+                               clipper=True, resizable=True, row_background=True, scrollY=True, height=-1,
+                               policy=dpg.mvTable_SizingStretchProp):
+                    for label, column in DB_COLUMNS:
+                        dpg.add_table_column(label=label, user_data=column, default_sort=(column == "profile_id"))
             
             # --- Tab 4: Product Calculator ---
             with dpg.tab(label="Product Calculator"):
@@ -101,6 +180,7 @@ def launch_ui():
                               callback=on_product_change)
                 dpg.add_separator()
                 dpg.add_text("Components:", color=[0, 255, 255])
+                dpg.add_text("", tag="product_components_info")
                 dpg.add_group(tag="product_components_group", horizontal=False)
                 dpg.add_separator()
                 dpg.add_button(label="Calculate Profiles Needed", tag="calculate_profiles_btn",
@@ -111,7 +191,10 @@ def launch_ui():
     
     dpg.setup_dearpygui()
     dpg.show_viewport()
-    dpg.start_dearpygui()
+    # Render loop driven here so progress from the allocation thread is picked up every frame
+    while dpg.is_dearpygui_running():
+        poll_allocation_progress()
+        dpg.render_dearpygui_frame()
     dpg.destroy_context()
 
 def file_dialog_callback(sender, app_data):
@@ -120,19 +203,32 @@ def file_dialog_callback(sender, app_data):
 
 def file_selection_callback(sender, app_data):
     """Handle file selection from dialog"""
-    if app_data['file_path_name']:
+    selections = list(app_data.get('selections', {}).values())
+    if len(selections) > 1:
+        handle_files_selection(selections)
+    elif app_data['file_path_name']:
         handle_file_selection(app_data['file_path_name'])
 
+def allocation_running(action):
+    """True, with a status message, while an allocation run owns the requirements and the write lock"""
+    if allocation_job['thread'] is None:
+        return False
+    update_status(f"Cancel the running allocation before {action}")
+    return True
+
 def handle_file_selection(file_path):
     """Handle file selection and parse requirements"""
     global requirements_manager
+    if allocation_running("loading another file"):
+        return
     
     try:
-        if not file_path.lower().endswith(('.xlsx', '.xls')):
-            update_status("Error: Please select an Excel file (.xlsx or .xls)")
+        if not file_path.lower().endswith(CUTLIST_EXTENSIONS):
+            update_status(f"Error: Please select a cutlist file ({', '.join(CUTLIST_EXTENSIONS)})")
             return
         
         # Load requirements
+        instrumentation.start_run(os.path.basename(file_path))
         if requirements_manager.load_file(file_path):
             filename = os.path.basename(file_path)
             dpg.set_value("file_info", f"Selected: {filename}")
@@ -147,79 +243,183 @@ def handle_file_selection(file_path):
     except Exception as e:
         update_status(f"Error handling file: {str(e)}")
 
-def display_requirements():
-    """Display parsed requirements in the UI"""
+def handle_files_selection(file_paths):
+    """Load several cutlists, with all their sheets, into one queue"""
     global requirements_manager
+    if allocation_running("loading other files"):
+        return
     
-    # Clear previous requirements safely
-    if dpg.does_item_exist("requirements_group"):
-        try:
-            dpg.delete_item("requirements_group", children_only=True)
-        except:
-            pass  # Ignore errors if item doesn't exist
+    try:
+        file_paths = [path for path in file_paths if path.lower().endswith(CUTLIST_EXTENSIONS)]
+        if not file_paths:
+            update_status(f"Error: Please select cutlist files ({', '.join(CUTLIST_EXTENSIONS)})")
+            return
+        
+        instrumentation.start_run(f"{len(file_paths)} cutlists")
+        if requirements_manager.load_files(file_paths):
+            names = ", ".join(os.path.basename(path) for path in file_paths)
+            dpg.set_value("file_info", f"Selected {len(file_paths)} files: {names}")
+            dpg.configure_item("process_button", enabled=True)
+            
+            display_requirements()
+            update_status(f"{len(file_paths)} files loaded")
+        else:
+            update_status("Error: Failed to load files")
+    
+    except Exception as e:
+        update_status(f"Error handling files: {str(e)}")
+
+@instrumentation.timed("ui.display_requirements")
+def display_requirements():
+    """Display parsed requirements in the UI, updating only the rows that changed"""
+    global requirements_manager
     
     requirements = requirements_manager.get_requirements()
     
     if not requirements:
-        dpg.add_text("No requirements found", parent="requirements_group")
-        return
+        dpg.set_value("requirements_total", "No requirements found")
+    else:
+        # Display requirements summary
+        summary = requirements_manager.get_summary()
+        dpg.set_value("requirements_total", f"Total Requirements: {summary['total_requirements']}")
     
-    # Display requirements summary
-    summary = requirements_manager.get_summary()
-    dpg.add_text(f"Total Requirements: {summary['total_requirements']}", 
-                parent="requirements_group", color=[255, 255, 0])
-    
-    # Display each requirement
-    for i, req in enumerate(requirements):
-        status = "Processed" if req['processed'] else "Pending"
-        dpg.add_text(f"{i+1}. {req['requirement_type']}: {req['length']}mm x {req['quantity']}pcs - {status}", 
-                    parent="requirements_group")
+    # Each requirement, with its origin when several files are loaded. The requirement
+    # dicts live as long as the load, so their id() identifies the record.
+    show_source = len(requirements_manager.files) > 1
+    requirement_rows.sync(
+        (id(req), (f"{i+1}. {req['requirement_type']}: {req['length']}mm x {req['quantity']}pcs -",
+                   "Processed" if req['processed'] else "Pending",
+                   f"[{req['source_file']} / {req.get('sheet', '')}]" if show_source else ""))
+        for i, req in enumerate(requirements))
 
 
 def process_requirements_callback(sender, app_data, user_data):
-    """Process the loaded requirements"""
-    print("Callback triggered!")
+    """Start processing the loaded requirements on a worker thread"""
     global requirements_manager
+    if allocation_job['thread'] is not None:
+        return
+    update_status("Processing requirements...")
+    dpg.configure_item("process_button", enabled=False)
+    dpg.configure_item("cancel_button", enabled=True)
+    # The run holds the write lock until it ends, so other writes would freeze the window
+    for button in INVENTORY_WRITE_BUTTONS:
+        dpg.configure_item(button, enabled=False)
+
+    # Clear previous results safely
+    if dpg.does_item_exist("results_group"):
+        try:
+            dpg.delete_item("results_group", children_only=True)
+        except:
+            pass
+    dpg.set_value("progress_bar", 0.0)
+    dpg.configure_item("progress_bar", overlay="Starting...", show=True)
+
+    if instrumentation.is_enabled() and instrumentation.current_run() is None:
+        instrumentation.start_run(requirements_manager.current_file or "cutlist")
+
+    allocation_job['queue'] = queue.Queue()
+    allocation_job['cancel'] = threading.Event()
+    allocation_job['started'] = time.perf_counter()
+    allocation_job['thread'] = threading.Thread(
+        target=run_allocation,
+        args=(requirements_manager.get_unprocessed_requirements(), allocation_job['queue'], allocation_job['cancel']),
+        name="allocation", daemon=True)
+    allocation_job['thread'].start()
+
+
+def run_allocation(requirements, progress_queue, cancel_event):
+    """Worker thread: allocate and report through progress_queue; widgets are only touched by the render loop"""
+    def progress(done, total):
+        if cancel_event.is_set():
+            raise AllocationCancelled("Allocation cancelled")
+        progress_queue.put(('progress', done, total))
+
     try:
-        update_status("Processing requirements... Please wait")
-        dpg.configure_item("process_button", enabled=False)
-        
-        # Clear previous results safely
-        if dpg.does_item_exist("results_group"):
-            try:
-                dpg.delete_item("results_group", children_only=True)
-            except:
-                pass
-
-        # pydevd_pycharm.settrace(suspend=True, trace_only_current_thread=True)
-        # Get database connection and process
-        with get_connection() as conn:
-            summary = process_requirements(requirements_manager.get_unprocessed_requirements(), conn)
-        
-        # Update requirements display
-        display_requirements()
-        update_status("Requirements processed successfully!")
-        dpg.configure_item("process_button", enabled=True)
-
-        if summary:
-            dpg.add_separator(parent="results_group")
-            dpg.add_text(f"TOTAL new profiles allocated: {summary.get('total_new_profiles', 0)}",
-                 parent="results_group", color=[0, 255, 0])
-
-            per_prof = summary.get('per_profile_new') or {}
-            if per_prof:
-                dpg.add_text("Per-profile new allocations:", parent="results_group", color=[0, 255, 255])
-                for name, cnt in per_prof.items():
-                    dpg.add_text(f"  - {name}: {cnt}", parent="results_group")
-        
+        with get_connection_manager().write() as conn:
+            summary = process_requirements(requirements, conn, progress=progress)
+        progress_queue.put(('done', summary))
+    except AllocationCancelled:
+        progress_queue.put(('cancelled', None))
     except Exception as e:
-        update_status(f"Error processing requirements: {str(e)}")
-        dpg.configure_item("process_button", enabled=True)
+        progress_queue.put(('error', e))
+
+
+def cancel_processing_callback(sender, app_data, user_data):
+    """Ask the running allocation to stop; its transaction is rolled back"""
+    if allocation_job['cancel'] is not None:
+        allocation_job['cancel'].set()
+        dpg.configure_item("cancel_button", enabled=False)
+        update_status("Cancelling...")
+
+
+def poll_allocation_progress():
+    """Apply the worker's progress messages; called once per frame"""
+    job_queue = allocation_job['queue']
+    if job_queue is None:
+        return
+    while True:
+        try:
+            kind, *payload = job_queue.get_nowait()
+        except queue.Empty:
+            return
+        if kind != 'progress':
+            finish_allocation(kind, payload[0])
+            return
+
+        done, total = payload
+        overlay = f"{done / total:.0%}" if total else "100%"
+        if 0 < done < total:
+            elapsed = time.perf_counter() - allocation_job['started']
+            overlay += f", about {elapsed / done * (total - done):.0f}s left"
+        dpg.set_value("progress_bar", done / total if total else 1.0)
+        dpg.configure_item("progress_bar", overlay=overlay)
+
+
+def finish_allocation(outcome, payload):
+    """Show the result of a finished, cancelled or failed allocation run"""
+    allocation_job.update(thread=None, queue=None, cancel=None, started=None)
+    dpg.configure_item("process_button", enabled=True)
+    dpg.configure_item("cancel_button", enabled=False)
+    for button in INVENTORY_WRITE_BUTTONS:
+        dpg.configure_item(button, enabled=True)
+    dpg.configure_item("progress_bar", show=False)
+    report = instrumentation.finish_run()
+
+    if outcome == 'cancelled':
+        update_status("Processing cancelled, inventory unchanged")
+        return
+    if outcome == 'error':
+        update_status(f"Error processing requirements: {str(payload)}")
+        return
+
+    summary = payload
+    # Update requirements display
+    display_requirements()
+    update_status("Requirements processed successfully!")
+
+    if summary:
+        dpg.add_separator(parent="results_group")
+        dpg.add_text(f"TOTAL new profiles allocated: {summary.get('total_new_profiles', 0)}",
+             parent="results_group", color=[0, 255, 0])
+
+        per_prof = summary.get('per_profile_new') or {}
+        if per_prof:
+            dpg.add_text("Per-profile new allocations:", parent="results_group", color=[0, 255, 255])
+            for name, cnt in per_prof.items():
+                dpg.add_text(f"  - {name}: {cnt}", parent="results_group")
+
+    if report:
+        dpg.add_separator(parent="results_group")
+        dpg.add_text("Timing report:", parent="results_group", color=[0, 255, 255])
+        for line in report.format_lines():
+            dpg.add_text(line, parent="results_group")
 
 
 def clear_file_callback(sender, app_data, user_data):
     """Clear the selected file and requirements"""
     global requirements_manager
+    if allocation_running("clearing the file"):
+        return
     
     requirements_manager.clear_requirements()
     dpg.set_value("file_info", "No file selected")
@@ -227,11 +427,8 @@ def clear_file_callback(sender, app_data, user_data):
     update_status("File and requirements cleared")
     
     # Clear displays safely
-    if dpg.does_item_exist("requirements_group"):
-        try:
-            dpg.delete_item("requirements_group", children_only=True)
-        except:
-            pass
+    dpg.set_value("requirements_total", "")
+    requirement_rows.clear()
     
     if dpg.does_item_exist("results_group"):
         try:
@@ -247,12 +444,14 @@ def update_status(message):
 
 def submit_profile_callback(sender, app_data, user_data):
     """Callback for adding a new profile"""
+    if allocation_running("adding profiles"):
+        return
     try:
         name = dpg.get_value("profile_name_dropdown")
         length = float(dpg.get_value("length_input"))
         quantity = int(dpg.get_value("quantity_input"))
         
-        with get_connection() as conn:
+        with get_connection_manager().write() as conn:
             success = add_profile(conn, name, length, quantity)
         
         if success:
@@ -267,72 +466,122 @@ def submit_profile_callback(sender, app_data, user_data):
         update_status(f"Error adding profile: {str(e)}")
 
 
+def stock_take_selection_callback(sender, app_data):
+    """Import the selected stock-take sheet in one transaction"""
+    file_path = app_data.get('file_path_name')
+    if not file_path or allocation_running("importing a stock-take"):
+        return
+    try:
+        with get_connection_manager().write() as conn:
+            result = import_stock_take(conn, file_path)
+        refresh_database_view()
+        update_status(f"Imported {result['rows_read']} stock-take rows from {os.path.basename(file_path)}")
+    except Exception as e:
+        update_status(f"Error importing stock-take: {str(e)}")
+
+
+@instrumentation.timed("ui.refresh_database_view")
 def refresh_database_view():
-    """Load profiles from DB and display in a readable format"""
+    """Reload the bin totals and show the first page of the inventory table"""
     try:
-        with get_connection() as conn:
-            df = pd.read_sql_query(
-                "SELECT profile_id, name, length, quantity, bin FROM profiles ORDER BY profile_id, length",
-                conn
-            )
-        
-        # Clear previous content safely
-        if dpg.does_item_exist("db_view_group"):
-            try:
-                dpg.delete_item("db_view_group", children_only=True)
-            except:
-                pass
-        
-        if df.empty:
-            dpg.add_text("No profiles in database.", parent="db_view_group")
-            return
-        
-        # Display as formatted text with better formatting
-        headers = f"{'Profile ID':<12} {'Name':<40} {'Length (mm)':<12} {'Qty':<8} {'Bin':<15}"
-        dpg.add_text(headers, parent="db_view_group", color=[255, 255, 0])
-        dpg.add_text("-" * len(headers), parent="db_view_group")
-        
-        for _, row in df.iterrows():
-            line = f"{row['profile_id']:<12} {row['name']:<40} {row['length']:<12.0f} {row['quantity']:<8} {row['bin']:<15}"
-            dpg.add_text(line, parent="db_view_group")
+        with get_connection_manager().read() as conn:
+            bin_totals = get_bin_summary(conn)
+    except Exception as e:
+        show_database_error(e)
+        return
+    
+    # Totals per bin come straight from the trigger-maintained summary
+    bin_rows.sync(
+        (bin_class, (f"Bin {bin_class}: {row_count} lengths, {total_quantity} pcs, {total_metres:.1f} m",))
+        for bin_class, row_count, total_quantity, total_metres in bin_totals)
     
+    show_database_page(page_starts=[None])
+
+
+def show_database_error(error):
+    dpg.set_value("db_status_text", f"Error loading database: {error}")
+    dpg.configure_item("db_status_text", color=[255, 0, 0])
+
+
+@instrumentation.timed("ui.show_database_page")
+def show_database_page(page_starts=None, sort=None, descending=None):
+    """
+    Show a page of the inventory table, applying only the changed cells.
+    Arguments left as None keep the current paging and sort state; the state
+    only changes once the page has been read, so a failed read leaves the
+    table and the state as they were.
+    """
+    state = db_view_state
+    page_starts = state['page_starts'] if page_starts is None else page_starts
+    sort = state['sort'] if sort is None else sort
+    descending = state['descending'] if descending is None else descending
+    try:
+        with get_connection_manager().read() as conn:
+            # One extra row tells whether there is a next page
+            rows = get_profiles_page(conn, DB_PAGE_SIZE + 1, page_starts[-1], sort, descending)
+            total = count_profiles(conn)
     except Exception as e:
-        dpg.add_text(f"Error loading database: {e}", parent="db_view_group", color=[255, 0, 0])
+        show_database_error(e)
+        return False
+    
+    state.update(page_starts=page_starts, sort=sort, descending=descending,
+                 next=rows[DB_PAGE_SIZE - 1] if len(rows) > DB_PAGE_SIZE else None)
+    rows = rows[:DB_PAGE_SIZE]
+    
+    # Rows of another page or sort order are reused rather than recreated
+    db_rows.sync(profile_records(rows))
+    
+    dpg.set_value("db_status_text", "" if total else "No profiles in database.")
+    dpg.configure_item("db_status_text", color=[255, 255, 255])
+    first = (len(page_starts) - 1) * DB_PAGE_SIZE
+    dpg.set_value("db_page_info", f"Rows {first + 1 if rows else 0}-{first + len(rows)} of {total}")
+    dpg.configure_item("db_prev_button", enabled=len(page_starts) > 1)
+    dpg.configure_item("db_next_button", enabled=state['next'] is not None)
+    return True
+
+
+def db_next_page_callback(sender, app_data, user_data):
+    if db_view_state['next'] is not None:
+        show_database_page(page_starts=db_view_state['page_starts'] + [db_view_state['next']])
+
+
+def db_prev_page_callback(sender, app_data, user_data):
+    if len(db_view_state['page_starts']) > 1:
+        show_database_page(page_starts=db_view_state['page_starts'][:-1])
+
+
+def db_sort_callback(sender, sort_specs):
+    """Sort by the clicked header; the table is re-read from the first page in the new order"""
+    if not sort_specs:
+        column, descending = "profile_id", False
+    else:
+        column_id, direction = sort_specs[0]
+        column, descending = dpg.get_item_user_data(column_id), direction < 0
+    show_database_page([None], column, descending)
 
 
 def on_product_change(sender, app_data, user_data):
     """Render component rows for the selected product"""
     product = dpg.get_value("product_selector")
-    # Clear previous
-    if dpg.does_item_exist("product_components_group"):
-        try:
-            dpg.delete_item("product_components_group", children_only=True)
-        except:
-            pass
     if dpg.does_item_exist("product_calc_results_group"):
         try:
             dpg.delete_item("product_calc_results_group", children_only=True)
         except:
             pass
-    if not product:
-        dpg.configure_item("calculate_profiles_btn", enabled=False)
-        return
 
-    components = get_product_components(product)
-    if not components:
-        dpg.add_text("No component data for this product.", parent="product_components_group")
-        dpg.configure_item("calculate_profiles_btn", enabled=False)
-        return
+    components = get_product_components(product) if product else []
+    if product and not components:
+        dpg.set_value("product_components_info", "No component data for this product.")
+    else:
+        dpg.set_value("product_components_info", "")
 
-    # Build input rows: label (component), unit weight, input total weight
-    for idx, comp in enumerate(components):
-        row_tag = f"pc_row_{idx}"
-        with dpg.group(parent="product_components_group", horizontal=True):
-            dpg.add_text(f"{comp['component']}")
-            dpg.add_text(f"(unit {comp['unit_weight']} kg/profile)", color=[150, 150, 150])
-            dpg.add_input_float(label="Total weight (kg)", tag=f"pc_total_weight_{idx}",
-                                width=150, min_value=0.0, min_clamped=True, default_value=0.0)
-    dpg.configure_item("calculate_profiles_btn", enabled=True)
+    # Input rows: label (component), unit weight, input total weight
+    component_rows.sync((comp['component'], (comp['component'], f"(unit {comp['unit_weight']} kg/profile)"))
+                        for comp in components)
+    # Rows may have been reused from the previous product, so start every weight from zero
+    for comp in components:
+        dpg.set_value(component_rows.cells(comp['component'])[2], 0.0)
+    dpg.configure_item("calculate_profiles_btn", enabled=bool(components))
 
 
 def calculate_profiles_for_product(sender, app_data, user_data):
@@ -351,10 +600,10 @@ def calculate_profiles_for_product(sender, app_data, user_data):
     total_profiles = 0
     dpg.add_text(f"Product: {product}", parent="product_calc_results_group", color=[255, 255, 0])
 
-    for idx, comp in enumerate(components):
+    for comp in components:
         unit_w = comp['unit_weight']
         try:
-            total_w = float(dpg.get_value(f"pc_total_weight_{idx}") or 0.0)
+            total_w = float(dpg.get_value(component_rows.cells(comp['component'])[2]) or 0.0)
         except:
             total_w = 0.0
         profiles_needed = 0
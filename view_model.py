@@ -0,0 +1,111 @@
+"""
+Keyed rows for list views that are refreshed in place.
+
+A view hands sync() its records as (key, cells) pairs, where the key is the
+record's identity and cells are the values shown in the row. Only the
+differences to the previous sync reach the widgets: changed cells are set,
+rows of records that disappeared are reused for new records, and widgets are
+created, deleted or moved only when the row count or the order changes.
+
+The widget calls are supplied by the view, so nothing here depends on
+Dear PyGui.
+"""
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import instrumentation
+
+
+class KeyedRows:
+    """The rows of one list view, keyed by record identity"""
+
+    def __init__(self, add_row: Callable, set_cell: Callable, delete_row: Callable,
+                 move_row: Optional[Callable] = None):
+        """
+        add_row(cells) creates a row at the end and returns (row item, cell items),
+        set_cell(cell item, value) updates one cell, delete_row(row item) removes a
+        row and move_row(row item) moves it to the end. Without move_row the rows
+        keep their display order when records are reordered.
+        """
+        self.add_row = add_row
+        self.set_cell = set_cell
+        self.delete_row = delete_row
+        self.move_row = move_row
+        # key -> {'item', 'cells', 'values'}
+        self.rows = {}
+        # Keys in display order
+        self.order = []
+
+    def sync(self, records: Iterable[Tuple[Hashable, Sequence]]) -> Dict:
+        """Show exactly these records, in this order. Returns the number of widget changes by kind."""
+        records = [(key, tuple(values)) for key, values in records]
+        wanted = set()
+        for key, _ in records:
+            if key in wanted:
+                raise Exception(f"Duplicate row key {key!r}")
+            wanted.add(key)
+
+        changes = {'added': 0, 'deleted': 0, 'cells': 0, 'moved': 0}
+        # Rows of records that are gone, in display order, are reused before new rows are created
+        spare = [key for key in self.order if key not in wanted]
+        spare.reverse()
+        renamed = {}
+        added = []
+        rows = {}
+        for key, values in records:
+            row = self.rows.get(key)
+            if row is None and spare:
+                old_key = spare.pop()
+                row = self.rows[old_key]
+                renamed[old_key] = key
+            if row is None:
+                item, cells = self.add_row(values)
+                row = {'item': item, 'cells': list(cells), 'values': values}
+                added.append(key)
+                changes['added'] += 1
+            elif row['values'] != values:
+                for cell, old, new in zip(row['cells'], row['values'], values):
+                    if old != new:
+                        self.set_cell(cell, new)
+                        changes['cells'] += 1
+                row['values'] = values
+            rows[key] = row
+
+        for key in spare:
+            self.delete_row(self.rows[key]['item'])
+            changes['deleted'] += 1
+
+        # Order on screen now: surviving and reused rows where they were, new rows at the end
+        shown = [renamed.get(key, key) for key in self.order if key in wanted or key in renamed] + added
+        order = [key for key, _ in records]
+        if shown != order and self.move_row is not None:
+            for key in order:
+                self.move_row(rows[key]['item'])
+            changes['moved'] = len(order)
+
+        self.rows = rows
+        self.order = order if self.move_row is not None else shown
+        for kind, amount in changes.items():
+            if amount:
+                instrumentation.count(f"view.{kind}", amount)
+        return changes
+
+    def clear(self):
+        """Delete every row"""
+        return self.sync([])
+
+    def cells(self, key: Hashable) -> List:
+        """Cell items of the row showing key"""
+        return self.rows[key]['cells']
+
+    def __len__(self):
+        return len(self.order)
+
+
+def profile_records(rows) -> List[Tuple[Hashable, Tuple]]:
+    """
+    (key, cells) records for profiles rows (profile_id, name, length, quantity, bin).
+    A profile can be stocked in several lengths, so the key is the whole
+    primary key (profile_id, length).
+    """
+    return [((profile_id, length), (profile_id, name, f"{length:.0f}", str(quantity), bin_class))
+            for profile_id, name, length, quantity, bin_class in rows]
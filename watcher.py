@@ -0,0 +1,240 @@
+"""
+Watch-folder ingestion service.
+
+    python watcher.py //share/cutlists --db inventory.db
+
+The folder is polled every WATCH_POLL_INTERVAL seconds. A file is read once its
+size and modification time have stayed the same for WATCH_SETTLE_SECONDS, so
+files that are still being copied are left alone. Parsed cutlists pass
+through a bounded queue to a single allocation thread; when allocation falls
+behind, the scanner waits instead of parsing further ahead.
+
+Every file is recorded in the processed_files ledger by content hash, in the
+same transaction as its allocation, so a restart never allocates the same
+cutlist twice. A file that fails is recorded as failed and read again after it
+settles, up to WATCH_MAX_ATTEMPTS times per content, so transient causes such
+as a locked database or missing stock get another chance. After that it is
+only retried once its content changes or the service restarts.
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+from typing import List
+
+from config import (CUTLIST_EXTENSIONS, DB_PATH, WATCH_MAX_ATTEMPTS, WATCH_POLL_INTERVAL, WATCH_QUEUE_SIZE,
+                    WATCH_SETTLE_SECONDS)
+
+
+class FolderWatcher:
+    """Polls a folder and allocates every new or changed cutlist once"""
+
+    def __init__(self, folder: str, db_path: str = DB_PATH, poll_interval: float = WATCH_POLL_INTERVAL,
+                 settle_seconds: float = WATCH_SETTLE_SECONDS, queue_size: int = WATCH_QUEUE_SIZE,
+                 verbose: bool = False, max_attempts: int = WATCH_MAX_ATTEMPTS):
+        from database import ConnectionManager, setup_database
+
+        self.folder = folder
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.verbose = verbose
+        self.max_attempts = max_attempts
+        setup_database(db_path=db_path).close()
+        self.manager = ConnectionManager(db_path)
+        # (path, content hash, requirements) waiting for the allocation thread
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        # path -> ((size, mtime), monotonic time the signature was first seen)
+        self._candidates = {}
+        # path -> (size, mtime) already handed on, so unchanged files are not hashed again
+        self._handled = {}
+        # content hashes parsed but not yet in the ledger
+        self._in_flight = set()
+        # content hash -> failed attempts, and paths the allocation thread hands back for another try
+        self._failures = {}
+        self._retry = queue.SimpleQueue()
+        self.stats = {'processed': 0, 'failed': 0, 'skipped': 0}
+        self._worker = None
+
+    def scan(self) -> List[str]:
+        """Files that are new or changed and have settled, in name order"""
+        now = time.monotonic()
+        # Failed files are picked up again once they have settled
+        while True:
+            try:
+                self._handled.pop(self._retry.get_nowait(), None)
+            except queue.Empty:
+                break
+        present = set()
+        ready = []
+        for entry in os.scandir(self.folder):
+            name = entry.name
+            if (not entry.is_file() or name.startswith(('~$', '.'))
+                    or not name.lower().endswith(CUTLIST_EXTENSIONS)):
+                continue
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            present.add(entry.path)
+            if self._handled.get(entry.path) == signature:
+                continue
+
+            seen = self._candidates.get(entry.path)
+            if seen is None or seen[0] != signature:
+                # New or still growing: wait until it stops changing
+                self._candidates[entry.path] = (signature, now)
+                if self.settle_seconds > 0:
+                    continue
+            elif now - seen[1] < self.settle_seconds:
+                continue
+            del self._candidates[entry.path]
+            self._handled[entry.path] = signature
+            ready.append(entry.path)
+
+        # Forget deleted files so the bookkeeping stays as small as the folder
+        for paths in (self._candidates, self._handled):
+            for path in [path for path in paths if path not in present]:
+                del paths[path]
+        return sorted(ready)
+
+    def is_processed(self, content_hash: str) -> bool:
+        with self.manager.read() as conn:
+            row = conn.execute("SELECT 1 FROM processed_files WHERE content_hash = ? AND status = 'processed'",
+                               (content_hash,)).fetchone()
+        return row is not None
+
+    def submit(self, file_path: str):
+        """Parse a settled file and queue it for allocation, unless the ledger already has it"""
+        from excel_processor import parse_cutlist
+        from parse_cache import file_digest
+
+        try:
+            content_hash = file_digest(file_path)
+        except OSError as e:
+            # Removed or locked again since the scan; it is picked up on a later change
+            print(f"Warning: cannot read {file_path}: {e}")
+            self._handled.pop(file_path, None)
+            return
+        if (content_hash in self._in_flight or self._failures.get(content_hash, 0) >= self.max_attempts
+                or self.is_processed(content_hash)):
+            self.stats['skipped'] += 1
+            return
+
+        try:
+            requirements = parse_cutlist(file_path)
+        except Exception as e:
+            self._record_failure(content_hash, file_path, e)
+            return
+
+        self._in_flight.add(content_hash)
+        # Blocks while the queue is full, which holds back scanning and parsing
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put((file_path, content_hash, requirements), timeout=self.poll_interval)
+                return
+            except queue.Full:
+                continue
+        self._in_flight.discard(content_hash)
+
+    def _allocate_loop(self):
+        from excel_processor import process_requirements
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            file_path, content_hash, requirements = item
+            try:
+                start = time.perf_counter()
+                with self.manager.write() as conn:
+                    # The ledger row commits together with the allocation
+                    conn.execute("""
+                        INSERT OR REPLACE INTO processed_files (content_hash, path, status, requirements)
+                        VALUES (?, ?, 'processed', ?)
+                    """, (content_hash, file_path, len(requirements)))
+                    summary = process_requirements(requirements, conn, verbose=self.verbose)
+                    conn.execute("UPDATE processed_files SET new_profiles = ? WHERE content_hash = ?",
+                                 (summary['total_new_profiles'], content_hash))
+                self.stats['processed'] += 1
+                print(f"Processed {os.path.basename(file_path)}: {len(requirements)} requirements, "
+                      f"{summary['total_new_profiles']} new profiles in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                self._record_failure(content_hash, file_path, e)
+            finally:
+                self._in_flight.discard(content_hash)
+
+    def _record_failure(self, content_hash: str, file_path: str, error: Exception):
+        self.stats['failed'] += 1
+        attempts = self._failures[content_hash] = self._failures.get(content_hash, 0) + 1
+        print(f"Error processing {file_path} (attempt {attempts} of {self.max_attempts}): {error}")
+        if attempts < self.max_attempts:
+            self._retry.put(file_path)
+        try:
+            with self.manager.write() as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO processed_files (content_hash, path, status, error)
+                    VALUES (?, ?, 'failed', ?)
+                """, (content_hash, file_path, str(error)))
+        except Exception as e:
+            print(f"Warning: could not record failure of {file_path} in the ledger: {e}")
+
+    def start(self):
+        """Start the allocation thread"""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._allocate_loop, name="allocation", daemon=True)
+            self._worker.start()
+
+    def run(self, once: bool = False):
+        """Scan until stop() is called, or a single pass with once=True"""
+        self.start()
+        try:
+            while not self.stop_event.is_set():
+                for file_path in self.scan():
+                    if self.stop_event.is_set():
+                        break
+                    self.submit(file_path)
+                if once:
+                    break
+                self.stop_event.wait(self.poll_interval)
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Finish the queued files, then stop the allocation thread and close the connections"""
+        self.stop_event.set()
+        if self._worker is not None:
+            self.queue.put(None)
+            self._worker.join()
+            self._worker = None
+        self.manager.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Allocate cutlists dropped into a folder")
+    parser.add_argument("folder")
+    parser.add_argument("--db", default=DB_PATH, help="inventory database (created if missing, never reset)")
+    parser.add_argument("--interval", type=float, default=WATCH_POLL_INTERVAL, help="seconds between scans")
+    parser.add_argument("--settle", type=float, default=WATCH_SETTLE_SECONDS,
+                        help="seconds a file must stay unchanged before it is read")
+    parser.add_argument("--queue-size", type=int, default=WATCH_QUEUE_SIZE,
+                        help="parsed cutlists allowed to wait for allocation")
+    parser.add_argument("--once", action="store_true", help="process the files present now and exit")
+    parser.add_argument("--verbose", action="store_true", help="print the allocation of every line")
+    args = parser.parse_args(argv)
+
+    watcher = FolderWatcher(args.folder, args.db, args.interval, 0 if args.once else args.settle,
+                            args.queue_size, args.verbose)
+    print(f"Watching {args.folder}")
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        print("Stopping after the queued cutlists")
+        watcher.stop()
+    print(f"Processed {watcher.stats['processed']}, failed {watcher.stats['failed']}, "
+          f"skipped {watcher.stats['skipped']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))